@@ -0,0 +1,54 @@
+"""
+Per-request authentication overhead with and without the verified-token cache.
+
+Times, per call:
+  - verify_access_token: full jose signature + expiry check (the old per-request cost)
+  - decode_access_token: the cached path, after the token has been seen once
+  - get_current_user with warm token and principal caches, i.e. what an authenticated
+    request pays before the route runs when nothing has to be read from the DB
+
+Usage (from fastapi/, with the usual .env so core.config loads):
+    python -m benchmarks.bench_jwt_decode --number 20000
+"""
+
+import argparse
+import timeit
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from core.dependencies import get_current_user
+from core.principal_cache import principal_cache
+from core.security import create_access_token, decode_access_token, verify_access_token, token_cache
+from models.user import User
+
+EMAIL = "bench@example.com"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000, help="calls per measurement")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    token = create_access_token({"sub": EMAIL})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    decode_access_token(token)
+    principal_cache.set(EMAIL, (User(user_id="bench", email=EMAIL, name="bench"), None),
+                        principal_cache.generation)
+
+    cases = {
+        "verify_access_token (uncached)": lambda: verify_access_token(token),
+        "decode_access_token (cached)": lambda: decode_access_token(token),
+        "get_current_user (warm caches)": lambda: get_current_user(credentials, db=None),
+    }
+    print(f"{'case':<34} {'us/call':>9}")
+    baseline = None
+    for name, fn in cases.items():
+        best = min(timeit.repeat(fn, number=args.number, repeat=args.repeat)) / args.number
+        baseline = baseline or best
+        print(f"{name:<34} {best * 1e6:>9.2f}   ({baseline / best:.0f}x)")
+    print(f"token cache: {token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
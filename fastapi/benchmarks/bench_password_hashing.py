@@ -0,0 +1,95 @@
+"""
+Login password-check throughput against hashing pool size.
+
+Runs the password verification done by POST /auth/login through PasswordHasher
+with 0 (threadpool, the old behaviour) and 1..N process workers, keeping
+`--concurrency` checks in flight, and prints checks/s and latency percentiles.
+Also reports how late a 10 ms asyncio timer fires meanwhile, i.e. how much a
+login burst delays everything else on the event loop.
+
+Usage (from fastapi/, with the usual .env so core.config loads):
+    python -m benchmarks.bench_password_hashing --workers 1 2 4 --concurrency 32 --seconds 10
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi import HTTPException
+
+from core.config import settings
+from core.password_hasher import PasswordHasher
+from core.security import get_password_hash, calibrate_argon2, default_argon2_params
+
+PASSWORD = "correct horse battery staple"
+
+
+async def _lag_probe(stop: asyncio.Event, lags: list) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - start - 0.01)
+
+
+async def run(workers: int, concurrency: int, seconds: float, hashed: str) -> dict:
+    hasher = PasswordHasher(workers=workers, max_pending=concurrency)
+    await asyncio.gather(*(hasher.verify(PASSWORD, hashed) for _ in range(max(1, workers))))  # start workers
+
+    latencies: list = []
+    lags: list = []
+    rejected = 0
+    deadline = time.perf_counter() + seconds
+
+    async def client() -> None:
+        nonlocal rejected
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                assert await hasher.verify(PASSWORD, hashed)
+            except HTTPException:
+                rejected += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_lag_probe(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    hasher.shutdown()
+
+    latencies.sort()
+    return {
+        "workers": workers,
+        "checks_per_s": len(latencies) / elapsed,
+        "p50_ms": 1000 * statistics.median(latencies),
+        "p95_ms": 1000 * latencies[int(0.95 * (len(latencies) - 1))],
+        "loop_lag_p95_ms": 1000 * sorted(lags)[int(0.95 * (len(lags) - 1))] if lags else 0.0,
+        "rejected": rejected,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--target-ms", type=float, default=settings.ARGON2_TARGET_MS,
+                        help="calibrate the argon2id hash to this cost (0: configured parameters)")
+    args = parser.parse_args()
+
+    params = calibrate_argon2(args.target_ms) if args.target_ms > 0 else default_argon2_params()
+    hashed = get_password_hash(PASSWORD, params)
+    print(f"argon2id {params}, concurrency={args.concurrency}, {args.seconds:.0f}s per run")
+    print(f"{'workers':>7} {'checks/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'loop lag p95 ms':>16} {'rejected':>9}")
+    for workers in args.workers:
+        r = asyncio.run(run(workers, args.concurrency, args.seconds, hashed))
+        print(f"{r['workers']:>7} {r['checks_per_s']:>9.1f} {r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} "
+              f"{r['loop_lag_p95_ms']:>16.1f} {r['rejected']:>9}")
+
+
+if __name__ == "__main__":
+    main()
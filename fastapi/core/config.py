@@ -45,6 +45,24 @@ class Settings:
             raise ValueError("Missing required ALGORITHM in .env")
         if not os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES'):  # Enforce presence, even with default
             print("Warning: ACCESS_TOKEN_EXPIRE_MINUTES not set in .env—using default (30)")
+        # Password hashing: argon2id cost (time_cost is recalibrated at startup to take about
+        # ARGON2_TARGET_MS, 0 disables that) and the process pool running it
+        self.ARGON2_TARGET_MS = float(os.getenv('ARGON2_TARGET_MS', 250))
+        self.ARGON2_TIME_COST = int(os.getenv('ARGON2_TIME_COST', 3))
+        self.ARGON2_MEMORY_KIB = int(os.getenv('ARGON2_MEMORY_KIB', 64 * 1024))
+        self.ARGON2_PARALLELISM = int(os.getenv('ARGON2_PARALLELISM', 2))
+        self.PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+        self.PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 16 * max(1, self.PASSWORD_HASH_WORKERS)))
+
+        # Refresh tokens (rotated on every use) and the revocation filter's sizing
+        self.REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv('REFRESH_TOKEN_EXPIRE_DAYS', 14))
+        self.REVOCATION_FILTER_CAPACITY = int(os.getenv('REVOCATION_FILTER_CAPACITY', 100000))
+
+        # Verified access tokens remembered by decode_access_token
+        self.TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+
+        # How long get_current_user may reuse a loaded user/ban state (seconds)
+        self.PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv('PRINCIPAL_CACHE_TTL_SECONDS', 60))
         
         # Brevo (required)
         brevo_api_key = os.getenv("BREVO_API_KEY")  # e.g. xkeysib-xxxxxxxxxxxxxxxxxxxxxxx
@@ -5,6 +5,8 @@ from jose import JWTError
 
 from database.connection import SessionLocal
 from core.security import decode_access_token
+from core.principal_cache import principal_cache
+from core.token_revocation import token_revocation
 from models.user import User
 from models.ban import Ban
 
@@ -33,14 +35,28 @@ def get_current_user(
     email: str = payload.get("sub")
     if email is None:
         raise credentials_exception
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
+    # Refresh tokens only work at /auth/refresh; tokens from before `typ` existed are access tokens
+    if payload.get("typ", "access") != "access":
         raise credentials_exception
-    # Check if user is banned
-    active_ban = db.query(Ban).filter(Ban.user_id == user.user_id, Ban.is_active == True).first()
-    if active_ban:
+    # In-memory filter: no DB round trip unless the token id may have been revoked
+    if token_revocation.is_revoked(db, payload.get("jti"), payload.get("fam")):
+        raise credentials_exception
+    principal = principal_cache.get(email)
+    if principal is None:
+        generation = principal_cache.generation
+        user = db.query(User).filter(User.email == email).first()
+        if user is None:
+            raise credentials_exception
+        # Check if user is banned
+        active_ban = db.query(Ban).filter(Ban.user_id == user.user_id, Ban.is_active == True).first()
+        principal = (user, active_ban.reason if active_ban else None)
+        # Detach so the cached copy is not tied to (or expired by) this request's session
+        db.expunge(user)
+        principal_cache.set(email, principal, generation)
+    user, ban_reason = principal
+    if ban_reason is not None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail=f"User is banned: {active_ban.reason}"
+            detail=f"User is banned: {ban_reason}"
         )
-    return user
\ No newline at end of file
+    return user
@@ -0,0 +1,105 @@
+"""
+Password hashing off the request threadpool.
+
+Password hashes cost ~250 ms of CPU per hash/verify (argon2id is calibrated to
+that at startup, legacy bcrypt is about the same). Run inline, a
+burst of logins holds every Starlette threadpool slot and stalls all other sync
+endpoints. Here the work goes to a dedicated, bounded process pool awaited from
+async handlers, and callers beyond PASSWORD_HASH_MAX_PENDING get a 503 instead
+of queueing without limit.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Tuple
+import asyncio
+import multiprocessing
+import threading
+
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from core.config import settings
+from core import security
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self.rejected = 0
+        # Worker processes do not share this process's state, so parameters travel with each call
+        self.argon2_params = security.default_argon2_params()
+
+    def calibrate(self, target_ms: float) -> None:
+        """Tune argon2id time_cost for new hashes to about `target_ms` on this machine."""
+        self.argon2_params = security.calibrate_argon2(target_ms)
+        print(f"argon2id parameters for {target_ms:.0f} ms: {self.argon2_params}")
+
+    async def hash(self, password: str) -> str:
+        return await self._run(security.get_password_hash, password, self.argon2_params)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(security.verify_password, password, hashed)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Verify, and on success return a replacement hash if `hashed` is legacy or weaker."""
+        return await self._run(security.verify_and_update, password, hashed, self.argon2_params)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers, "pending": self._pending, "rejected": self.rejected,
+            "argon2": self.argon2_params,
+        }
+
+    # ---------- Internals ----------
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many sign-in attempts in progress, please retry",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+        try:
+            if self.workers <= 0:
+                # No pool configured (e.g. local dev): hash on the threadpool as before
+                return await run_in_threadpool(fn, *args)
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._executor(), fn, *args)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed): start a fresh pool for the next caller
+                self.shutdown()
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                    detail="Password service restarting, please retry",
+                                    headers={"Retry-After": "1"})
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn, not fork: the server process already runs threads (scheduler, caches)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+
+# Shared per-process pool, started on first use
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
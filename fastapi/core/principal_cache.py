@@ -0,0 +1,52 @@
+"""
+Short-lived cache of authenticated principals for get_current_user.
+
+Keyed by the token subject (email). An entry holds the user, detached from the
+session that loaded it, and the reason of their active ban (None if not banned),
+so a cached request needs neither the user nor the ban query. Entries are dropped
+when the user is updated or banned/unbanned; a generation counter stops a lookup
+that started before such a change from caching what it read.
+"""
+
+from typing import Dict, Optional, Tuple
+import threading
+
+from core.config import settings
+from models.user import User
+from utils.cache import TTLCache
+
+Principal = Tuple[User, Optional[str]]  # (user, active ban reason)
+
+
+class PrincipalCache:
+    def __init__(self, maxsize: int = 4096, ttl: float = 60.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        """Read before loading a principal and pass to set()."""
+        return self._generation
+
+    def get(self, subject: str) -> Optional[Principal]:
+        return self._cache.get(subject)
+
+    def set(self, subject: str, principal: Principal, generation: int) -> None:
+        with self._lock:
+            if generation == self._generation:
+                self._cache.set(subject, principal)
+
+    def invalidate(self, *subjects: Optional[str]) -> None:
+        with self._lock:
+            self._generation += 1
+            for subject in subjects:
+                if subject:
+                    self._cache.pop(subject)
+
+    def stats(self) -> Dict[str, int]:
+        return self._cache.stats()
+
+
+# Shared per-process cache
+principal_cache = PrincipalCache(ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS)
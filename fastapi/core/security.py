@@ -3,19 +3,81 @@ Security functions for the API
 """
 
 from datetime import datetime, timedelta, timezone
-from typing import Union, Optional
+from typing import Union, Optional, Dict, Tuple
+import hashlib
+import time
+import uuid
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from passlib.hash import argon2
 from core.config import settings
+from utils.cache import TTLCache
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing: new hashes are argon2id; bcrypt/scrypt hashes (users.password_algo)
+# still verify and are replaced by argon2id on the next successful login.
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt", "scrypt"], deprecated=["bcrypt", "scrypt"], argon2__type="ID"
+)
+
+Argon2Params = Dict[str, int]  # time_cost, memory_cost (KiB), parallelism
+
+def default_argon2_params() -> Argon2Params:
+    return {
+        "time_cost": settings.ARGON2_TIME_COST,
+        "memory_cost": settings.ARGON2_MEMORY_KIB,
+        "parallelism": settings.ARGON2_PARALLELISM,
+    }
+
+def _argon2(params: Optional[Argon2Params]):
+    params = params or default_argon2_params()
+    return argon2.using(
+        type="ID", rounds=params["time_cost"], memory_cost=params["memory_cost"],
+        parallelism=params["parallelism"],
+    )
+
+def calibrate_argon2(target_ms: float, samples: int = 3) -> Argon2Params:
+    """
+    argon2id parameters whose hashing takes about `target_ms` on this machine: memory and
+    parallelism stay as configured, time_cost is scaled from the measured cost of one pass.
+    """
+    params = {**default_argon2_params(), "time_cost": 1}
+    handler = _argon2(params)
+    elapsed = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        handler.hash("calibration")
+        elapsed.append(time.perf_counter() - start)
+    per_pass_ms = 1000 * sorted(elapsed)[len(elapsed) // 2]
+    params["time_cost"] = max(1, round(target_ms / per_pass_ms))
+    return params
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+def get_password_hash(password: str, argon2_params: Optional[Argon2Params] = None) -> str:
+    return _argon2(argon2_params).hash(password)
+
+def needs_rehash(hashed_password: str, argon2_params: Optional[Argon2Params] = None) -> bool:
+    """True for non-argon2id hashes and argon2 hashes weaker than the current parameters."""
+    if pwd_context.identify(hashed_password) != "argon2":
+        return True
+    params = argon2_params or default_argon2_params()
+    current = argon2.from_string(hashed_password)
+    return (
+        current.type != "id"
+        or current.rounds < params["time_cost"]
+        or current.memory_cost < params["memory_cost"]
+    )
+
+def verify_and_update(
+    plain_password: str, hashed_password: str, argon2_params: Optional[Argon2Params] = None
+) -> Tuple[bool, Optional[str]]:
+    """(valid, new hash to store or None)."""
+    if not pwd_context.verify(plain_password, hashed_password):
+        return False, None
+    if needs_rehash(hashed_password, argon2_params):
+        return True, get_password_hash(plain_password, argon2_params)
+    return True, None
 
 # JWT token creation
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -24,14 +86,43 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.now(timezone.utc) + expires_delta
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # jti makes the token individually revocable (logout); typ keeps refresh tokens out of auth
+    to_encode.setdefault("jti", uuid.uuid4().hex)
+    to_encode.update({"exp": expire, "typ": "access"})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def create_refresh_token(data: dict) -> str:
+    """Long-lived token accepted only by /auth/refresh; `data` should carry the family id `fam`."""
+    to_encode = data.copy()
+    to_encode.setdefault("jti", uuid.uuid4().hex)
+    expire = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    to_encode.update({"exp": expire, "typ": "refresh"})
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
 # JWT token verification
-def decode_access_token(token: str) -> Optional[dict]:
+# Claims of tokens whose signature was already verified, keyed by the token's SHA-256 and
+# expiring with the token, so repeat requests with the same token skip the crypto.
+# Failed verifications are not cached.
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+def verify_access_token(token: str) -> Optional[dict]:
+    """Full signature and expiry check, no cache."""
     try:
         decoded = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         return decoded
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+def decode_access_token(token: str) -> Optional[dict]:
+    key = hashlib.sha256(token.encode()).digest()
+    claims = token_cache.get(key)
+    if claims is None:
+        claims = verify_access_token(token)
+        if claims is None:
+            return None
+        exp = claims.get("exp")
+        remaining = exp - time.time() if isinstance(exp, (int, float)) else None
+        if remaining is None or remaining > 0:
+            token_cache.set(key, claims, ttl=remaining)
+    return dict(claims)
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""
+Revocation list for access and refresh tokens.
+
+Revoked token ids (`jti`, or a refresh-token family `fam`) are stored in
+revoked_tokens. In memory there is only a Bloom filter over them, about 1.2 bytes
+per id at 1% false positives. An id the filter has never seen is accepted
+without touching the DB, and that covers every request made with a live token.
+Only filter positives (revoked ids plus the ~1% false positives) are confirmed
+against the table, and those answers are cached.
+
+The filter is rebuilt from the table at startup and after expired rows are
+purged, so it survives restarts and does not fill up over time.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+import threading
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select, delete
+
+from core.config import settings
+from models.revoked_token import RevokedToken
+from utils.bloom import BloomFilter
+from utils.cache import TTLCache
+
+FALSE_POSITIVE_RATE = 0.01
+
+
+class TokenRevocationList:
+    def __init__(self, capacity: int):
+        self._capacity = capacity
+        self._lock = threading.Lock()
+        self._filter = BloomFilter(capacity, FALSE_POSITIVE_RATE)
+        self._recent: Optional[List[str]] = None  # ids revoked while load() rebuilds the filter
+        self._confirmed = TTLCache(maxsize=10000, ttl=300)  # id -> revoked? for filter positives
+        self.db_checks = 0
+
+    # ---------- Build ----------
+    def load(self, db: Session) -> int:
+        """Rebuild the filter from the unexpired rows of revoked_tokens."""
+        with self._lock:
+            self._recent = []
+        ids = db.execute(
+            select(RevokedToken.jti).where(RevokedToken.expires_at > datetime.utcnow())
+        ).scalars().all()
+        bloom = BloomFilter(max(self._capacity, 2 * len(ids)), FALSE_POSITIVE_RATE)
+        bloom.update(ids)
+        with self._lock:
+            bloom.update(self._recent)
+            self._recent = None
+            self._filter = bloom
+            self._confirmed.clear()
+        return len(ids)
+
+    def purge_expired(self, db: Session) -> int:
+        """Drop rows no token can match any more, then rebuild the filter without them."""
+        result = db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow()))
+        db.commit()
+        self.load(db)
+        return result.rowcount
+
+    # ---------- Revoke / check ----------
+    def revoke(self, db: Session, ids: Dict[str, datetime]) -> None:
+        """Revoke token ids until their expiry (naive UTC) and commit."""
+        ids = {token_id: expires_at for token_id, expires_at in ids.items() if token_id}
+        if not ids:
+            return
+        with self._lock:
+            # Filter first: a failed commit only costs a false positive, never a missed revocation
+            self._filter.update(ids)
+            if self._recent is not None:
+                self._recent.extend(ids)
+        for token_id, expires_at in ids.items():
+            db.merge(RevokedToken(jti=token_id, expires_at=expires_at))
+        db.commit()
+        for token_id in ids:
+            self._confirmed.set(token_id, True)
+
+    def is_revoked(self, db: Session, *ids: Optional[str]) -> bool:
+        with self._lock:
+            candidates = [token_id for token_id in ids if token_id and token_id in self._filter]
+        if not candidates:
+            return False
+        unknown = []
+        for token_id in candidates:
+            known = self._confirmed.get(token_id)
+            if known:
+                return True
+            if known is None:
+                unknown.append(token_id)
+        if not unknown:
+            return False
+        self.db_checks += 1
+        revoked = set(db.execute(
+            select(RevokedToken.jti)
+            .where(RevokedToken.jti.in_(unknown), RevokedToken.expires_at > datetime.utcnow())
+        ).scalars().all())
+        for token_id in unknown:
+            self._confirmed.set(token_id, token_id in revoked)
+        return bool(revoked)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "filter_items": self._filter.count,
+            "filter_bytes": self._filter.nbytes,
+            "db_checks": self.db_checks,
+        }
+
+
+# Shared per-process list, loaded at startup
+token_revocation = TokenRevocationList(capacity=settings.REVOCATION_FILTER_CAPACITY)
@@ -19,16 +19,22 @@ from routes.order import router as orders_router
 from routes.bans import router as bans_router
 from routes.blacklists import router as blacklists_router
 from routes.review import router as review_router
+from routes.saved_searches import router as saved_searches_router
+from routes.admin import router as admin_router
 
 # update order statuses automatically
 from contextlib import asynccontextmanager
 from tasks import start_scheduler, stop_scheduler
+from core.password_hasher import password_hasher
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    if settings.ARGON2_TARGET_MS > 0:
+        password_hasher.calibrate(settings.ARGON2_TARGET_MS)
     start_scheduler()
     yield
     stop_scheduler()
+    password_hasher.shutdown()
 
 # Create FastAPI app
 app = FastAPI(
@@ -97,6 +103,12 @@ app.include_router(bans_router, prefix="/api/v1")
 # blacklists router
 app.include_router(blacklists_router, prefix="/api/v1")
 
+# saved searches / new-listing alerts router
+app.include_router(saved_searches_router, prefix="/api/v1")
+
+# admin runtime stats router
+app.include_router(admin_router, prefix="/api/v1")
+
 @app.get("/")
 async def root():
     return {
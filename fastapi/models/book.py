@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    Column, String, Integer, DateTime, Enum, Boolean, ForeignKey, Text, DECIMAL
+    Column, String, Integer, DateTime, Enum, Boolean, ForeignKey, Text, DECIMAL, Index
 )
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.mysql import JSON
@@ -42,6 +42,7 @@ class Book(Base):
 
     # other attributes
     isbn = Column(String(32), nullable=True)
+    isbn13 = Column(String(13), nullable=True, index=True)       # canonical ISBN-13 derived from isbn
     tags = Column(JSON, nullable=True)                           # tags: string[]（MySQL JSON）
     publish_year = Column(Integer, nullable=True)
     max_lending_days = Column(Integer, nullable=False, default=14)
@@ -50,3 +51,9 @@ class Book(Base):
     delivery_method = Column(Enum(*DELIVERY_METHOD_ENUM, name="delivery_method_enum"), nullable=False, default="both")
     sale_price = Column(DECIMAL(10, 2), nullable=True)
     deposit = Column(DECIMAL(10, 2), nullable=True)
+    # coalesce(sale_price, deposit, 0), maintained by BookService; backs price sorts and ranges
+    effective_price = Column(DECIMAL(10, 2), nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        Index("ix_book_status_effective_price", "status", "effective_price", "id"),
+    )
@@ -0,0 +1,23 @@
+"""
+Precomputed "similar books" for the book detail page.
+"""
+
+from sqlalchemy import Column, String, SmallInteger, Float, DateTime, ForeignKey
+from sqlalchemy.sql import func
+
+from models.base import Base
+
+
+class BookSimilarity(Base):
+    """
+    Top-N neighbours of each book, written by the nightly similarity job
+    (services/similarity_service.py). The (book_id, rank) primary key makes
+    "neighbours of X in order" one clustered range read.
+    """
+    __tablename__ = "book_similarity"
+
+    book_id = Column(String(36), ForeignKey("book.id", ondelete="CASCADE"), primary_key=True)
+    rank = Column(SmallInteger, primary_key=True)
+    similar_book_id = Column(String(36), ForeignKey("book.id", ondelete="CASCADE"), nullable=False)
+    score = Column(Float, nullable=False)
+    computed_at = Column(DateTime, server_default=func.now(), nullable=False)
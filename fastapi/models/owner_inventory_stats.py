@@ -0,0 +1,32 @@
+"""
+Per-owner inventory counters for the owner dashboard.
+"""
+
+from sqlalchemy import Column, String, Integer, DECIMAL, DateTime, ForeignKey
+from sqlalchemy.sql import func
+
+from models.base import Base
+
+
+class OwnerInventoryStats(Base):
+    """
+    One row per owner, kept current by BookService and OrderService in the same
+    transaction as the status change (services/inventory_stats_service.py), so the
+    dashboard reads a single row instead of aggregating book/orders.
+    """
+    __tablename__ = "owner_inventory_stats"
+
+    owner_id = Column(String(25), ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True)
+
+    # Books by current status
+    listed_count = Column(Integer, nullable=False, default=0)
+    unlisted_count = Column(Integer, nullable=False, default=0)
+    lent_count = Column(Integer, nullable=False, default=0)
+    sold_count = Column(Integer, nullable=False, default=0)
+
+    # Owner's share of non-canceled orders (sale price + shipping for purchases, shipping for borrows)
+    total_earnings = Column(DECIMAL(12, 2), nullable=False, default=0)
+    # Deposits of borrow orders not yet completed or canceled
+    outstanding_deposits = Column(DECIMAL(12, 2), nullable=False, default=0)
+
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
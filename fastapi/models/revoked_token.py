@@ -0,0 +1,21 @@
+"""
+Revoked JWT ids (access/refresh token `jti`, or a refresh token family `fam`).
+"""
+
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.sql import func
+
+from models.base import Base
+
+
+class RevokedToken(Base):
+    """
+    Persistent side of core/token_revocation.py: the in-memory filter is rebuilt from
+    these rows at startup. Rows are purged once `expires_at` (the last moment a token
+    with this id could still be accepted) has passed.
+    """
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(64), primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, server_default=func.now(), nullable=False)
@@ -0,0 +1,44 @@
+"""
+Saved searches and the alerts they produce.
+"""
+
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, DECIMAL, Index
+from sqlalchemy.sql import func
+from models.base import Base
+import uuid
+
+
+class SavedSearch(Base):
+    """A user's stored /books/search filters; new listings matching them become alerts."""
+    __tablename__ = "saved_searches"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String(25), ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False, index=True)
+    name = Column(String(100), nullable=True)
+
+    # Same meaning as the /books/search parameters; NULL means "any"
+    q = Column(String(255), nullable=True)
+    category = Column(String(128), nullable=True)
+    lang = Column(String(64), nullable=True)
+    can_rent = Column(Boolean, nullable=True)
+    can_sell = Column(Boolean, nullable=True)
+    delivery = Column(String(10), nullable=True)
+    min_price = Column(DECIMAL(10, 2), nullable=True)
+    max_price = Column(DECIMAL(10, 2), nullable=True)
+
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+
+class SavedSearchMatch(Base):
+    """A book that matched a saved search when it was listed."""
+    __tablename__ = "saved_search_matches"
+
+    saved_search_id = Column(String(36), ForeignKey("saved_searches.id", ondelete="CASCADE"), primary_key=True)
+    book_id = Column(String(36), ForeignKey("book.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(String(25), ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
+    matched_at = Column(DateTime, server_default=func.now(), nullable=False)
+    seen = Column(Boolean, nullable=False, default=False)
+
+    __table_args__ = (
+        Index("ix_saved_search_matches_user", "user_id", "seen", "matched_at"),
+    )
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException
+from core.dependencies import get_current_user
+from core.principal_cache import principal_cache
+from core.password_hasher import password_hasher
+from core.security import token_cache
+from core.token_revocation import token_revocation
+from models.user import User as UserModel
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+@router.get("/stats")
+def runtime_stats(user: UserModel = Depends(get_current_user)):
+    """
+    In-process auth cache, revocation filter and password pool counters for this worker.
+    Admin only: /health stays a plain liveness check.
+    """
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return {
+        "principal_cache": principal_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "token_cache": token_cache.stats(),
+        "token_revocation": token_revocation.stats(),
+    }
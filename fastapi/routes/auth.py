@@ -1,13 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from datetime import timedelta
 from pydantic import BaseModel, EmailStr, field_validator  # Updated: Use field_validator for v2
 from typing import Optional
+from starlette.concurrency import run_in_threadpool
 
-from core.config import settings
-from core.security import create_access_token, verify_password, get_password_hash
-from core.dependencies import get_db, get_current_user
+from fastapi.security import HTTPAuthorizationCredentials
+from core.security import decode_access_token
+from core.password_hasher import password_hasher
+from core.dependencies import get_db, get_current_user, bearer_scheme
 from services.auth_service import AuthService
 from models.user import User
 from models.ban import Ban
@@ -47,22 +48,39 @@ class UserResponse(BaseModel):
 
 class Token(BaseModel):
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str = "bearer"
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
 class LoginRequest(BaseModel):
     email: EmailStr
     password: str
 
+def _save_user(db: Session, user: User) -> None:
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+
+def _active_ban(db: Session, user_id: str) -> Optional[Ban]:
+    return db.query(Ban).filter(Ban.user_id == user_id, Ban.is_active == True).first()
+
+# register/login are async so password hashing runs in the hashing process pool without holding a
+# threadpool slot; their DB calls still go through run_in_threadpool.
 @router.post("/register", response_model=UserResponse)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     auth_service = AuthService(db)
     
     # Check if user exists
-    if auth_service.get_user_by_email(user_data.email):
+    if await run_in_threadpool(auth_service.get_user_by_email, user_data.email):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Hash password
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     
     # Create user (location/avatar optional, can be updated later)
     user = User(
@@ -70,11 +88,9 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         name=user_data.name,
         email=user_data.email,
         password_hash=hashed_password,
-        password_algo="bcrypt"
+        password_algo="argon2id"
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    await run_in_threadpool(_save_user, db, user)
     
     return UserResponse(
         id=user.user_id,
@@ -86,9 +102,9 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
 
 @router.post("/login", response_model=Token)
-def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     auth_service = AuthService(db)
-    user = auth_service.authenticate_user(login_data.email, login_data.password)
+    user = await auth_service.authenticate_user_async(login_data.email, login_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -97,23 +113,32 @@ def login(login_data: LoginRequest, db: Session = Depends(get_db)):
         )
 
     # Check if user is banned
-    active_ban = db.query(Ban).filter(Ban.user_id == user.user_id, Ban.is_active == True).first()
+    active_ban = await run_in_threadpool(_active_ban, db, user.user_id)
     if active_ban:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"Account is banned: {active_ban.reason}"
         )
 
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token}
+    return auth_service.issue_tokens(user)
+
+@router.post("/refresh", response_model=Token)
+def refresh(body: RefreshRequest, db: Session = Depends(get_db)):
+    """Rotate a refresh token: returns a new access/refresh pair and revokes the one sent."""
+    return AuthService(db).refresh_tokens(body.refresh_token)
 
 @router.post("/logout")
-def logout(current_user: User = Depends(get_current_user)):
-    # Client-side: clear token from storage
-    # Optional: Implement token blacklist here if needed
+def logout(
+    body: Optional[LogoutRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    # Revokes this access token and every token of its login (refresh tokens included);
+    # the client should still clear them from storage
+    AuthService(db).revoke_session(
+        decode_access_token(credentials.credentials), body.refresh_token if body else None
+    )
     return {"message": "Logged out successfully"}
 
 @router.get("/me", response_model=UserResponse)
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from core.dependencies import get_db, get_current_user
+from core.principal_cache import principal_cache
 from models.user import User as UserModel
 from services.ban_service import BanService
 from pydantic import BaseModel
@@ -23,6 +24,11 @@ router = APIRouter(prefix="/bans", tags=["bans"])
 def is_admin(user: UserModel) -> bool:
     return user.is_admin
 
+def _forget_principal(db: Session, user_id: str) -> None:
+    """Make the (un)banned user's next request re-read their ban state."""
+    target = db.query(UserModel.email).filter(UserModel.user_id == user_id).first()
+    principal_cache.invalidate(target.email if target else None)
+
 @router.post("", status_code=status.HTTP_201_CREATED)
 def create_ban(
     body: BanCreate,
@@ -32,6 +38,7 @@ def create_ban(
     if not is_admin(user):
         raise HTTPException(status_code=403, detail="Admin access required")
     ban = BanService.create(db, body.user_id, body.reason, user.user_id)
+    _forget_principal(db, ban.user_id)
     return BanRead(**ban.__dict__)
 
 @router.get("")
@@ -55,4 +62,5 @@ def unban(
     ban = BanService.unban(db, ban_id)
     if not ban:
         raise HTTPException(status_code=404, detail="Ban not found")
+    _forget_principal(db, ban.user_id)
     return BanRead(**ban.__dict__)
@@ -1,42 +1,85 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from pydantic import BaseModel, Field, conlist
+from pydantic import BaseModel, Field, conlist, ValidationError, field_validator
 from typing import Optional, List, Literal, Dict, Any
+from datetime import date, datetime
+from decimal import Decimal
+import csv
+import io
+import json
+import zlib
 
 from services.book_service import BookService
 from core.dependencies import get_db, get_current_user
+from database.connection import SessionLocal
 from models.book import Book
+from utils.http_cache import etag_matches, is_not_modified, not_modified, set_validators, weak_etag
 
 router = APIRouter(prefix="/api/v1/books", tags=["books"])
 
 # -------- Helper: Convert to frontend format --------
-def _to_read(b: Book) -> dict:
-    return {
-        "id": b.id,
-        "ownerId": b.owner_id,
-        "titleOr": b.title_or,
-        "titleEn": b.title_en,
-        "originalLanguage": b.original_language,
-        "author": b.author,
-        "category": b.category,
-        "description": b.description,
-        "coverImgUrl": b.cover_img_url,
-        "conditionImgURLs": b.condition_img_urls or [],
-        "status": b.status,
-        "condition": b.condition,
-        "canRent": b.can_rent,
-        "canSell": b.can_sell,
-        "dateAdded": b.date_added,
-        "updateDate": b.update_date,
-        "isbn": b.isbn,
-        "tags": b.tags or [],
-        "publishYear": b.publish_year,
-        "maxLendingDays": b.max_lending_days,
-        "deliveryMethod": b.delivery_method,
-        "salePrice": b.sale_price,
-        "deposit": b.deposit,
-    }
+# Response key -> Book attribute, in response order. Also the vocabulary of `fields=`.
+READ_FIELDS = {
+    "id": "id",
+    "ownerId": "owner_id",
+    "titleOr": "title_or",
+    "titleEn": "title_en",
+    "originalLanguage": "original_language",
+    "author": "author",
+    "category": "category",
+    "description": "description",
+    "coverImgUrl": "cover_img_url",
+    "conditionImgURLs": "condition_img_urls",
+    "status": "status",
+    "condition": "condition",
+    "canRent": "can_rent",
+    "canSell": "can_sell",
+    "dateAdded": "date_added",
+    "updateDate": "update_date",
+    "isbn": "isbn",
+    "tags": "tags",
+    "publishYear": "publish_year",
+    "maxLendingDays": "max_lending_days",
+    "deliveryMethod": "delivery_method",
+    "salePrice": "sale_price",
+    "deposit": "deposit",
+}
+# JSON list columns are sent as [] rather than null
+READ_LIST_FIELDS = {"conditionImgURLs", "tags"}
+
+
+def _to_read(b: Book, fields: Optional[List[str]] = None) -> dict:
+    """Serialize a book; with `fields`, only those keys (and only those attributes are touched)."""
+    out = {}
+    for key in fields or READ_FIELDS:
+        value = getattr(b, READ_FIELDS[key])
+        out[key] = (value or []) if key in READ_LIST_FIELDS else value
+    return out
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse `fields=titleOr,coverImgUrl` into response keys; `id` is always included."""
+    if not fields:
+        return None
+    keys = [k.strip() for k in fields.split(",") if k.strip()]
+    unknown = [k for k in keys if k not in READ_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {unknown}")
+    return ["id"] + [k for k in dict.fromkeys(keys) if k != "id"]
+
+
+def _columns(fields: Optional[List[str]]) -> Optional[List[str]]:
+    return [READ_FIELDS[k] for k in fields] if fields else None
+
+
+def _book_etag(book_id: str, updated: datetime, fields: Optional[List[str]]) -> str:
+    """Strong ETag for one book's representation: its update_date, and the projection if any."""
+    tag = f"book-{book_id}-{updated.strftime('%Y%m%d%H%M%S%f')}"
+    if fields:
+        tag += "-" + ".".join(fields)
+    return f'"{tag}"'
 
 
 class BookCreate(BaseModel):
@@ -89,7 +132,12 @@ def create_book(
     db: Session = Depends(get_db),
     user = Depends(get_current_user),
 ):
-    p = {
+    book = BookService.create(db, owner_id=user.user_id, payload=_create_payload(payload))
+    return _to_read(book)
+
+
+def _create_payload(payload: BookCreate) -> dict:
+    return {
         "title_or": payload.titleOr,
         "title_en": payload.titleEn,
         "original_language": payload.originalLanguage,
@@ -110,13 +158,189 @@ def create_book(
         "sale_price": payload.salePrice,
         "deposit": payload.deposit,
     }
-    book = BookService.create(db, owner_id=user.user_id, payload=p)
-    return _to_read(book)
+
+
+# -------- Bulk import (CSV / JSONL) --------
+IMPORT_LIST_FIELDS = {"tags", "conditionImgURLs"}
+
+
+def _csv_value(key: str, value: str):
+    # List columns hold a JSON array or a "|"-separated string
+    if key in IMPORT_LIST_FIELDS:
+        value = value.strip()
+        if value.startswith("["):
+            return json.loads(value)
+        return [v.strip() for v in value.split("|") if v.strip()]
+    return value
+
+
+def _raw_import_rows(stream, fmt: str):
+    """Yield (row number, raw dict or error) one row at a time."""
+    if fmt == "csv":
+        # Row 1 is the header; empty cells fall back to the BookCreate defaults
+        for row_no, raw in enumerate(csv.DictReader(stream), start=2):
+            try:
+                yield row_no, {k: _csv_value(k, v) for k, v in raw.items() if k and v not in (None, "")}
+            except ValueError as e:
+                yield row_no, f"invalid list value: {e}"
+    else:
+        for row_no, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                raw = json.loads(line)
+            except ValueError as e:
+                yield row_no, f"invalid JSON: {e}"
+                continue
+            yield row_no, raw if isinstance(raw, dict) else "each line must be a JSON object"
+
+
+def _import_rows(file: UploadFile, fmt: str):
+    """Yield (row number, snake_case payload, error) validated against BookCreate."""
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        for row_no, raw in _raw_import_rows(stream, fmt):
+            if isinstance(raw, str):
+                yield row_no, None, raw
+                continue
+            try:
+                yield row_no, _create_payload(BookCreate(**raw)), None
+            except ValidationError as e:
+                yield row_no, None, [
+                    {"field": ".".join(str(p) for p in err["loc"]), "msg": err["msg"]} for err in e.errors()
+                ]
+    finally:
+        stream.detach()
+
+
+@router.post("/import", response_model=dict)
+def import_books(
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv","jsonl"]] = Query(None, description="defaults from the file extension"),
+    batch_size: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    user = Depends(get_current_user),
+):
+    """
+    Bulk-list books from a CSV (header row of BookCreate field names) or JSONL upload.
+    The file is parsed as a stream and inserted in batches; invalid rows are reported, not fatal.
+    """
+    fmt = format
+    if fmt is None:
+        name = (file.filename or "").lower()
+        if name.endswith(".csv"):
+            fmt = "csv"
+        elif name.endswith((".jsonl", ".ndjson")):
+            fmt = "jsonl"
+        else:
+            raise HTTPException(status_code=400, detail="Cannot tell the file format; pass format=csv or format=jsonl")
+    return BookService.bulk_import(db, user.user_id, _import_rows(file, fmt), batch_size=batch_size)
+
+
+# -------- Export (CSV / JSONL stream) --------
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+def _export_record(row) -> dict:
+    """One exported book, typed as the API sends it: money as float, dates in ISO 8601, lists as []."""
+    out = {}
+    for key, value in zip(READ_FIELDS, row):
+        if key in READ_LIST_FIELDS:
+            value = value or []
+        elif isinstance(value, Decimal):
+            value = float(value)
+        elif isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        out[key] = value
+    return out
+
+
+def _csv_cell(key: str, value):
+    # Lists as "|"-joined text so the CSV round-trips through /import
+    if key in READ_LIST_FIELDS:
+        return "|".join(value)
+    return "" if value is None else value
+
+
+def _export_lines(rows, fmt: str):
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(READ_FIELDS)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        for row in rows:
+            writer.writerow([_csv_cell(k, v) for k, v in _export_record(row).items()])
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    else:
+        for row in rows:
+            yield json.dumps(_export_record(row), ensure_ascii=False) + "\n"
+
+
+def _export_stream(stmts, fmt: str, compress: bool):
+    """Serialize the export in ~64 KB chunks (gzip-compressed on the fly if asked) on its own session."""
+    db = SessionLocal()
+    gz = zlib.compressobj(wbits=31) if compress else None  # wbits=31: gzip container
+    try:
+        parts, size = [], 0
+        rows = BookService.stream_rows(db, stmts, READ_FIELDS.values()) if stmts is not None else ()
+        for line in _export_lines(rows, fmt):
+            parts.append(line)
+            size += len(line)
+            if size >= EXPORT_CHUNK_BYTES:
+                data = "".join(parts).encode("utf-8")
+                parts, size = [], 0
+                data = gz.compress(data) if gz else data
+                if data:
+                    yield data
+        data = "".join(parts).encode("utf-8")
+        if gz:
+            data = gz.compress(data) + gz.flush()
+        if data:
+            yield data
+    finally:
+        db.close()
+
+
+@router.get("/export")
+def export_books(
+    format: Literal["csv","jsonl"] = "csv",
+    gzip: bool = Query(False, description="gzip the stream (Content-Encoding: gzip)"),
+    q: Optional[str] = None,
+    lang: Optional[str] = None,
+    category: Optional[str] = None,
+    canRent: Optional[bool] = None,
+    canSell: Optional[bool] = None,
+    delivery: Literal["any","post","pickup","both"] = "any",
+    minPrice: Optional[float] = None,
+    maxPrice: Optional[float] = None,
+    near: Optional[str] = None,
+    radiusKm: Optional[float] = Query(None, gt=0, le=500),
+    db: Session = Depends(get_db),
+):
+    """
+    Stream every listed book matching the search filters as CSV (same columns as /import)
+    or JSONL, through server-side cursors, in constant memory.
+    """
+    stmts = BookService.export_parts(
+        db, q=q, lang=lang, category=category, can_rent=canRent, can_sell=canSell,
+        delivery=delivery, min_price=minPrice, max_price=maxPrice, near=near, radius_km=radiusKm,
+    )
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="books.{format}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(_export_stream(stmts, format, gzip), media_type=media_type, headers=headers)
 
 
 # -------- List --------
 @router.get("", response_model=dict)
 def list_books(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     q: Optional[str] = None,
@@ -124,22 +348,61 @@ def list_books(
     category: Optional[str] = None,
     owner_id: Optional[str] = None,
     status: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (keyset mode)"),
+    include_total: Optional[bool] = Query(None, description="defaults to true without a cursor, false with one"),
+    fields: Optional[str] = Query(None, description="comma-separated keys to return, e.g. titleOr,coverImgUrl"),
     db: Session = Depends(get_db),
 ):
-    items, total = BookService.list(db, page, page_size, q, author, category, owner_id, status)
-    return {"items": [_to_read(b) for b in items], "total": total, "page": page, "page_size": page_size}
+    keys = _parse_fields(fields)
+    result = BookService.list(
+        db, page, page_size, q, author, category, owner_id, status,
+        cursor=cursor, include_total=include_total, columns=_columns(keys),
+    )
+    # Weak ETag over what the page shows: which rows, their newest change, and the paging metadata
+    etag = weak_etag(
+        "books", [b.id for b in result["items"]], BookService.last_modified(result["items"]),
+        result["total"], result["next_cursor"], keys,
+    )
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_validators(response, etag)
+    return {
+        "items": [_to_read(b, keys) for b in result["items"]],
+        "total": result["total"],
+        "page": page,
+        "page_size": page_size,
+        "next_cursor": result["next_cursor"],
+    }
 
 
 # -------- Get Filter Options --------
 @router.get("/filter-options")
-def get_filter_options(db: Session = Depends(get_db)):
-    """Get all unique categories and languages for filter dropdowns."""
-    return BookService.get_filter_options(db)
+def get_filter_options(request: Request, response: Response, db: Session = Depends(get_db)):
+    """Get all unique categories and languages for filter dropdowns (ETag-revalidated)."""
+    options, etag = BookService.get_filter_options(db)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return options
+
+
+# -------- Suggest (typeahead) --------
+@router.get("/suggest")
+def suggest_books(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=20),
+    type: Optional[Literal["title","author","category"]] = None,
+    db: Session = Depends(get_db),
+):
+    return {"items": BookService.suggest(db, prefix, limit, type)}
 
 
 # -------- Search --------
 @router.get("/search")
 def search_books(
+    request: Request,
+    response: Response,
     q: Optional[str] = Query(None, description="keyword in title/author/description/ISBN"),
     lang: Optional[str] = Query(None),
     category: Optional[str] = None,
@@ -149,23 +412,104 @@ def search_books(
     delivery: Literal["any","post","pickup","both"] = "any",
     minPrice: Optional[float] = None,
     maxPrice: Optional[float] = None,
-    sort: Literal["relevance","newest","price_asc","price_desc"] = "relevance",
+    sort: Literal["relevance","newest","price_asc","price_desc","distance"] = "relevance",
     page: int = 1,
     page_size: int = 20,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (keyset mode)"),
+    include_total: Optional[bool] = Query(None, description="defaults to true without a cursor, false with one"),
+    count: Literal["exact","estimate","auto"] = Query("auto", description="allow estimated totals for broad queries"),
+    facets: bool = Query(False, description="also return per-value counts for the sidebar filters"),
+    near: Optional[str] = Query(None, description="postcode to measure owner distance from (ignored if it has no known centroid)"),
+    radiusKm: Optional[float] = Query(None, gt=0, le=500, description="only owners within this distance of `near`"),
     db: Session = Depends(get_db),
 ):
-    items, total = BookService.search_books(
-        db=db, q=q, lang=lang, category=category, status=status, can_rent=canRent, can_sell=canSell,
+    result = BookService.search_books_cached(
+        db, q=q, lang=lang, category=category, status=status, can_rent=canRent, can_sell=canSell,
         delivery=delivery, min_price=minPrice, max_price=maxPrice,
-        sort=sort, page=page, page_size=page_size
+        sort=sort, page=page, page_size=page_size,
+        cursor=cursor, include_total=include_total, count_mode=count, with_facets=facets,
+        near=near, radius_km=radiusKm,
+    )
+    last_modified = result.pop("last_modified")
+    etag = weak_etag(
+        "search", [item["id"] for item in result["items"]], last_modified,
+        result["total"], result["next_cursor"],
+        sorted((name, sorted(counts.items(), key=repr)) for name, counts in result.get("facets", {}).items()),
     )
-    return {"items": items, "total": total, "page": page, "page_size": page_size}
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_validators(response, etag)
+    return {**result, "page": page, "page_size": page_size}
+
+
+# -------- Bulk status/price update --------
+class BookBulkPatch(BaseModel):
+    status: Optional[Literal["listed","unlisted","lent","sold"]] = None
+    salePrice: Optional[float] = None
+    deposit: Optional[float] = None
+    canRent: Optional[bool] = None
+    canSell: Optional[bool] = None
+
+    # May be left out, but not set to null: the columns are NOT NULL (prices may be cleared)
+    @field_validator("status", "canRent", "canSell")
+    @classmethod
+    def not_null(cls, v, info):
+        if v is None:
+            raise ValueError(f"{info.field_name} cannot be null")
+        return v
+
+class BookBulkItem(BaseModel):
+    id: str
+    patch: BookBulkPatch
+
+class BookBulkUpdate(BaseModel):
+    items: conlist(BookBulkItem, min_length=1, max_length=1000)
+
+BULK_FIELD_MAPPING = {"salePrice": "sale_price", "canRent": "can_rent", "canSell": "can_sell"}
+
+@router.put("/bulk", response_model=dict)
+def bulk_update_books(
+    payload: BookBulkUpdate,
+    db: Session = Depends(get_db),
+    user = Depends(get_current_user),
+):
+    items = [
+        (item.id, {BULK_FIELD_MAPPING.get(k, k): v for k, v in item.patch.dict(exclude_unset=True).items()})
+        for item in payload.items
+    ]
+    books = BookService.bulk_update(db, user.user_id, items)
+    return {"updated": len(books), "items": [_to_read(b) for b in books]}
 
 
 # -------- Get by ID --------
 @router.get("/{book_id}", response_model=dict)
-def get_book(book_id: str, db: Session = Depends(get_db)):
-    return _to_read(BookService.get(db, book_id))
+def get_book(
+    book_id: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="comma-separated keys to return"),
+    db: Session = Depends(get_db),
+):
+    """Book detail with a strong ETag and Last-Modified from update_date (304 on revalidation)."""
+    keys = _parse_fields(fields)
+    # Revalidation only needs update_date, not the row
+    updated = BookService.get_version(db, book_id)
+    etag = _book_etag(book_id, updated, keys)
+    if is_not_modified(request, etag, updated):
+        return not_modified(etag, last_modified=updated)
+
+    book = BookService.get(db, book_id, columns=_columns(keys))
+    set_validators(response, _book_etag(book_id, book.update_date, keys), book.update_date)
+    return _to_read(book, keys)
+
+# -------- Similar books --------
+@router.get("/{book_id}/similar", response_model=dict)
+def similar_books(
+    book_id: str,
+    limit: int = Query(10, ge=1, le=20),
+    db: Session = Depends(get_db),
+):
+    return {"items": BookService.similar(db, book_id, limit)}
 
 # -------- Update --------
 @router.put("/{book_id}", response_model=dict)
@@ -11,6 +11,7 @@ import json
 
 from core.dependencies import get_db, get_current_user
 from core.security import decode_access_token
+from core.token_revocation import token_revocation
 from services.message_service import MessageService
 from models.message import Message
 from models.user import User
@@ -88,6 +89,8 @@ async def get_current_user_ws(
         email: str = payload.get("sub")
         if email is None:
             raise credential_exception
+        if payload.get("typ", "access") != "access" or token_revocation.is_revoked(db, payload.get("jti"), payload.get("fam")):
+            raise credential_exception
         user = db.query(User).filter(User.email == email).first()
         if user is None:
             raise credential_exception
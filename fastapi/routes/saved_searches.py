@@ -0,0 +1,108 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from pydantic import BaseModel, Field
+from typing import Optional, Literal
+
+from core.dependencies import get_db, get_current_user
+from models.saved_search import SavedSearch
+from services.saved_search_service import SavedSearchService
+
+router = APIRouter(prefix="/saved-searches", tags=["saved-searches"])
+
+
+class SavedSearchCreate(BaseModel):
+    name: Optional[str] = Field(None, max_length=100)
+    q: Optional[str] = Field(None, max_length=255)
+    category: Optional[str] = None
+    lang: Optional[str] = None
+    canRent: Optional[bool] = None
+    canSell: Optional[bool] = None
+    delivery: Optional[Literal["any","post","pickup","both"]] = None
+    minPrice: Optional[float] = None
+    maxPrice: Optional[float] = None
+
+
+def _to_read(s: SavedSearch) -> dict:
+    return {
+        "id": s.id,
+        "name": s.name,
+        "q": s.q,
+        "category": s.category,
+        "lang": s.lang,
+        "canRent": s.can_rent,
+        "canSell": s.can_sell,
+        "delivery": s.delivery,
+        "minPrice": float(s.min_price) if s.min_price is not None else None,
+        "maxPrice": float(s.max_price) if s.max_price is not None else None,
+        "createdAt": s.created_at,
+    }
+
+
+@router.post("", response_model=dict)
+def create_saved_search(
+    payload: SavedSearchCreate,
+    db: Session = Depends(get_db),
+    user = Depends(get_current_user),
+):
+    """Save search filters; books listed later that match them show up in /saved-searches/alerts."""
+    saved = SavedSearchService.create(db, user.user_id, {
+        "name": payload.name,
+        "q": payload.q,
+        "category": payload.category,
+        "lang": payload.lang,
+        "can_rent": payload.canRent,
+        "can_sell": payload.canSell,
+        "delivery": payload.delivery,
+        "min_price": payload.minPrice,
+        "max_price": payload.maxPrice,
+    })
+    return _to_read(saved)
+
+
+@router.get("", response_model=dict)
+def list_saved_searches(db: Session = Depends(get_db), user = Depends(get_current_user)):
+    return {"items": [_to_read(s) for s in SavedSearchService.list(db, user.user_id)]}
+
+
+@router.get("/alerts", response_model=dict)
+def list_alerts(
+    unseen_only: bool = True,
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    user = Depends(get_current_user),
+):
+    """Books that matched one of my saved searches when they were listed, newest first."""
+    rows = SavedSearchService.alerts(db, user.user_id, unseen_only, limit)
+    return {"items": [
+        {
+            "savedSearchId": m.saved_search_id,
+            "matchedAt": m.matched_at,
+            "seen": m.seen,
+            "book": {
+                "id": b.id,
+                "titleOr": b.title_or,
+                "author": b.author,
+                "coverImgUrl": b.cover_img_url,
+                "canRent": b.can_rent,
+                "canSell": b.can_sell,
+                "deposit": float(b.deposit) if b.deposit is not None else None,
+                "salePrice": float(b.sale_price) if b.sale_price is not None else None,
+            },
+        }
+        for m, b in rows
+    ]}
+
+
+@router.post("/alerts/seen", response_model=dict)
+def mark_alerts_seen(db: Session = Depends(get_db), user = Depends(get_current_user)):
+    return {"updated": SavedSearchService.mark_seen(db, user.user_id)}
+
+
+@router.delete("/{search_id}", status_code=204)
+def delete_saved_search(
+    search_id: str,
+    db: Session = Depends(get_db),
+    user = Depends(get_current_user),
+):
+    SavedSearchService.delete(db, user.user_id, search_id)
+    return None
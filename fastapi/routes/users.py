@@ -8,6 +8,10 @@ from models.user import User
 from models.user import User as UserModel
 from sqlalchemy.orm import Session
 from services.blacklist_service import BlacklistService
+from services.geo_index import owner_geo_index
+from services.search_cache import search_cache
+from services.inventory_stats_service import InventoryStatsService
+from core.principal_cache import principal_cache
 
 
 router = APIRouter(prefix="/user", tags=["User"])
@@ -133,6 +137,24 @@ def get_user_by_id_login_only(
     return _to_user_response(u)
 
 
+@router.get("/{user_id}/inventory-stats")
+def get_inventory_stats(
+    user_id: str,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user),
+):
+    """
+    Owner dashboard summary: books by status, earnings and outstanding deposits.
+    Read from the pre-aggregated owner_inventory_stats row.
+
+    Raises:
+    - 403: If requesting another user's stats (admins excepted).
+    """
+    if user_id != current_user.user_id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to view these stats")
+    return InventoryStatsService.get(db, user_id)
+
+
 @router.put("/{user_id}")
 def update_user(
     user_id: str,
@@ -164,4 +186,8 @@ def update_user(
 
     db.commit()
     db.refresh(db_user)
+    principal_cache.invalidate(current_user.email, db_user.email)
+    if "zip_code" in update_data:
+        owner_geo_index.set_owner(db_user.user_id, db_user.zip_code)
+        search_cache.invalidate()  # cached results carry distances to this owner
     return db_user
\ No newline at end of file
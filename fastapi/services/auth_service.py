@@ -2,10 +2,29 @@
 Handles user creation and authentication logic.
 """
 import uuid
-from typing import Optional
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any
+from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from models.user import User
-from core.security import verify_password
+from models.ban import Ban
+from core.config import settings
+from core.security import verify_password, create_access_token, create_refresh_token, decode_access_token
+from core.password_hasher import password_hasher
+from core.principal_cache import principal_cache
+from core.token_revocation import token_revocation
+
+# Serializes refresh-token rotation so one refresh token cannot be exchanged twice concurrently
+_rotation_lock = threading.Lock()
+
+def _expires_at(claims: Dict[str, Any]) -> datetime:
+    return datetime.utcfromtimestamp(claims["exp"])
+
+def _family_expires_at() -> datetime:
+    """Latest expiry of any refresh token of a family issued up to now."""
+    return datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
 
 class AuthService:
     def __init__(self, db: Session):
@@ -21,7 +40,80 @@ class AuthService:
         if not verify_password(password, user.password_hash):
             return None
         return user
+
+    async def authenticate_user_async(self, email: str, password: str) -> Optional[User]:
+        """authenticate_user for async handlers: DB on the threadpool, password check on the hashing pool."""
+        user = await run_in_threadpool(self.get_user_by_email, email)
+        if not user:
+            return None
+        valid, new_hash = await password_hasher.verify_and_update(password, user.password_hash)
+        if not valid:
+            return None
+        if new_hash:
+            # Legacy (bcrypt/scrypt) or under-strength hash: store the argon2id one
+            await run_in_threadpool(self._set_password_hash, user, new_hash)
+        return user
+
+    def _set_password_hash(self, user: User, new_hash: str) -> None:
+        user.password_hash = new_hash
+        user.password_algo = "argon2id"
+        self.db.commit()
+        self.db.refresh(user)
+        principal_cache.invalidate(user.email)
     
+    # ---------- Tokens ----------
+    def issue_tokens(self, user: User, family: Optional[str] = None) -> Dict[str, str]:
+        """
+        Access + refresh token pair. Both carry the session's family id `fam`, so revoking
+        the family (logout, refresh-token reuse) ends every token of that login at once.
+        """
+        claims = {"sub": user.email, "fam": family or uuid.uuid4().hex}
+        return {
+            "access_token": create_access_token(
+                claims, expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+            ),
+            "refresh_token": create_refresh_token(claims),
+            "token_type": "bearer",
+        }
+
+    def refresh_tokens(self, refresh_token: str) -> Dict[str, str]:
+        """Exchange a refresh token for a new pair; the presented one is revoked (rotation)."""
+        credentials_exception = HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+        claims = decode_access_token(refresh_token)
+        if not claims or claims.get("typ") != "refresh" or not claims.get("jti") or not claims.get("fam"):
+            raise credentials_exception
+        with _rotation_lock:
+            if token_revocation.is_revoked(self.db, claims["jti"], claims["fam"]):
+                # An already-rotated refresh token came back: assume it leaked and end the session
+                token_revocation.revoke(self.db, {claims["fam"]: _family_expires_at()})
+                raise credentials_exception
+            user = self.get_user_by_email(claims.get("sub"))
+            if not user:
+                raise credentials_exception
+            active_ban = self.db.query(Ban).filter(Ban.user_id == user.user_id, Ban.is_active == True).first()
+            if active_ban:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail=f"Account is banned: {active_ban.reason}"
+                )
+            token_revocation.revoke(self.db, {claims["jti"]: _expires_at(claims)})
+        return self.issue_tokens(user, family=claims["fam"])
+
+    def revoke_session(self, access_claims: Dict[str, Any], refresh_token: Optional[str] = None) -> None:
+        """Logout: revoke the access token, its login family and, if given, the refresh token."""
+        ids = {access_claims.get("jti"): _expires_at(access_claims)}
+        families = {access_claims.get("fam")}
+        refresh_claims = decode_access_token(refresh_token) if refresh_token else None
+        if refresh_claims and refresh_claims.get("typ") == "refresh":
+            ids[refresh_claims.get("jti")] = _expires_at(refresh_claims)
+            families.add(refresh_claims.get("fam"))
+        ids.update({family: _family_expires_at() for family in families if family})
+        token_revocation.revoke(self.db, ids)
+
     def generate_user_id(self) -> str:
         return str(uuid.uuid4())[:25]  # Truncate to match DB schema
     
@@ -0,0 +1,91 @@
+"""
+Result counts for book list/search pages.
+
+Exact totals are cached for a short TTL keyed on the normalized filter set,
+and cleared whenever BookService writes a book. Broad queries can be answered
+with an estimate instead: the candidate count from the search index for
+keyword queries, or MySQL's table statistics for an unfiltered catalog.
+"""
+
+from typing import Any, Hashable, Optional, Tuple
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from utils.cache import TTLCache
+
+# Keyword queries matching at least this many indexed books get an estimated total in "auto" mode
+ESTIMATE_THRESHOLD = 2000
+
+
+class BookCounts:
+    def __init__(self, ttl: float = 30.0, maxsize: int = 2048):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def key(scope: str, **filters: Any) -> Hashable:
+        """Order-independent cache key; unset (None) filters are dropped."""
+        return (scope,) + tuple(sorted((k, v) for k, v in filters.items() if v is not None))
+
+    def exact(self, db: Session, key: Hashable, stmt) -> int:
+        """
+        count(*) over `stmt`, served from cache while fresh. `stmt` may also be a list of
+        statements over disjoint rows (e.g. keyword candidates split into id chunks); their
+        counts are added up.
+        """
+        total = self._cache.get(key)
+        if total is None:
+            parts = stmt if isinstance(stmt, list) else [stmt]
+            total = sum(
+                db.execute(select(func.count()).select_from(part.subquery())).scalar() or 0 for part in parts
+            )
+            self._cache.set(key, total)
+        return total
+
+    def remember(self, key: Hashable, total: int) -> None:
+        self._cache.set(key, total)
+
+    def resolve(
+        self, db: Session, key: Hashable, stmt, mode: str,
+        candidate_count: Optional[int] = None, unfiltered: bool = False,
+    ) -> Tuple[int, bool]:
+        """
+        Return (total, is_exact).
+        mode "exact" always counts; "estimate" prefers a cheap estimate; "auto" estimates only
+        when the query is broad (many keyword candidates, or no filters at all).
+        """
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached, True
+        if mode != "exact":
+            broad = candidate_count is not None and candidate_count >= ESTIMATE_THRESHOLD
+            if candidate_count is not None and (broad or mode == "estimate"):
+                return candidate_count, False
+            if unfiltered:
+                estimate = self.table_estimate(db)
+                if estimate is not None:
+                    return estimate, False
+        return self.exact(db, key, stmt), True
+
+    @staticmethod
+    def table_estimate(db: Session) -> Optional[int]:
+        """
+        Approximate row count of `book` from InnoDB statistics (no scan).
+        Read on a connection of its own, so a failure cannot abort the caller's transaction.
+        """
+        try:
+            with db.get_bind().connect() as conn:
+                return conn.execute(text(
+                    "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'book'"
+                )).scalar()
+        except SQLAlchemyError:
+            return None
+
+    def invalidate(self) -> None:
+        self._cache.clear()
+
+
+# Shared per-process counter
+book_counts = BookCounts()
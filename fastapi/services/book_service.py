@@ -1,23 +1,49 @@
 from __future__ import annotations
-from typing import Optional, Tuple, List, Dict, Any, Literal
+from typing import Optional, Tuple, List, Dict, Any, Literal, Iterable, Iterator
 from uuid import uuid4
 from datetime import datetime
+from decimal import Decimal
+import heapq
+import math
 import shlex
-import re
 
-from sqlalchemy.orm import Session
-from sqlalchemy import select, func, or_, and_
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import select, insert, update, func, or_, and_, case, bindparam
+from sqlalchemy.exc import SQLAlchemyError
+from fastapi import HTTPException
 
 from models.book import Book
+from models.book_similarity import BookSimilarity
+from services.search_index import search_index, query_terms, Fuzzy
+from services.trigram_index import trigram_index
+from services.suggest_index import suggest_index
+from services.geo_index import postcodes, owner_geo_index, normalize_postcode, Point
+from services.book_counts import book_counts
+from services.search_cache import search_cache
+from services.saved_search_service import saved_search_index
+from services.filter_options_cache import filter_options_cache
+from services.inventory_stats_service import InventoryDelta
+from utils.pagination import encode_cursor, decode_cursor, finite_float
+from utils.validators import to_isbn13
+
+# Price facet buckets as (low, high) on effective_price; the last one is open-ended
+PRICE_BUCKETS = ((0, 10), (10, 20), (20, 50), (50, None))
+
+# Longest IN list of keyword candidate ids sent to SQL; more candidates are split across queries
+CANDIDATE_IN_LIMIT = 1000
+
+# Book attributes read by BookService._to_search_read; search pages load only these
+SEARCH_READ_COLUMNS = (
+    "title_or", "author", "status", "cover_img_url", "can_rent", "can_sell",
+    "deposit", "sale_price", "delivery_method", "owner_id", "date_added", "update_date",
+)
 
 class BookService:
     # ---------- Create ----------
     @staticmethod
-    def create(db: Session, owner_id: str, payload: Dict[str, Any]) -> Book:
-        """The payload is expected to have key names consistent with the Book model fields (snake_case).
-            If your route receives camelCase or specially named keys from the frontend, 
-            you can first convert the key names in the route."""
-        book = Book(
+    def _book_values(owner_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Column values for a new book row, shared by create() and bulk_import()."""
+        return dict(
             id=str(uuid4()),
             owner_id=owner_id,
 
@@ -40,6 +66,7 @@ class BookService:
             # Time
             # date_added uses server_default=NOW(), so no need to insert manually; same for update_date
             isbn=payload.get("isbn"),
+            isbn13=to_isbn13(payload.get("isbn")),
             tags=payload.get("tags") or [],
             publish_year=payload.get("publish_year"),
             max_lending_days=int(payload.get("max_lending_days", 14)),
@@ -47,12 +74,95 @@ class BookService:
             delivery_method=payload.get("delivery_method", "both"),
             sale_price=payload.get("sale_price"),
             deposit=payload.get("deposit"),
+            effective_price=BookService.effective_price(payload.get("sale_price"), payload.get("deposit")),
         )
+
+    @staticmethod
+    def create(db: Session, owner_id: str, payload: Dict[str, Any]) -> Book:
+        """The payload is expected to have key names consistent with the Book model fields (snake_case).
+            If your route receives camelCase or specially named keys from the frontend, 
+            you can first convert the key names in the route."""
+        book = Book(**BookService._book_values(owner_id, payload))
         db.add(book)
+        delta = InventoryDelta()
+        delta.book_status(owner_id, None, book.status)
+        delta.apply(db)
         db.commit()
         db.refresh(book)
+        BookService._after_write(book, newly_listed=book.status == "listed")
         return book
 
+    # ---------- Bulk import ----------
+    @staticmethod
+    def bulk_import(
+        db: Session, owner_id: str, rows: Iterable[Tuple[int, Optional[Dict[str, Any]], Optional[Any]]],
+        batch_size: int = 500, max_reported_errors: int = 1000,
+    ) -> Dict[str, Any]:
+        """
+        Insert books from a stream of (row number, snake_case payload, error) tuples, where
+        exactly one of payload/error is set (error: a message or a list of {"field", "msg"}). Valid rows are inserted `batch_size` at a time with
+        one multi-row INSERT and one commit per batch, so memory stays flat for any input size.
+        Returns {"inserted", "failed", "errors"}; only the first `max_reported_errors` errors are listed.
+        """
+        inserted = 0
+        failed = 0
+        errors: List[Dict[str, Any]] = []
+        batch: List[Tuple[int, Dict[str, Any]]] = []
+
+        def report(row_no: int, error: Any) -> None:
+            nonlocal failed
+            failed += 1
+            if len(errors) < max_reported_errors:
+                if isinstance(error, str):
+                    error = [{"field": None, "msg": error}]
+                errors.append({"row": row_no, "errors": error})
+
+        def counted(values: List[Dict[str, Any]]) -> InventoryDelta:
+            delta = InventoryDelta()
+            for v in values:
+                delta.book_status(owner_id, None, v["status"])
+            return delta
+
+        def flush() -> None:
+            nonlocal inserted
+            if not batch:
+                return
+            values = [v for _, v in batch]
+            try:
+                db.execute(insert(Book), values)
+                counted(values).apply(db)
+                db.commit()
+            except SQLAlchemyError:
+                # Some row violates a DB constraint: retry the batch row by row to isolate it
+                db.rollback()
+                values = []
+                for row_no, row_values in batch:
+                    try:
+                        db.execute(insert(Book), [row_values])
+                        counted([row_values]).apply(db)
+                        db.commit()
+                        values.append(row_values)
+                    except SQLAlchemyError as e:
+                        db.rollback()
+                        report(row_no, f"database error: {e.orig or e.__class__.__name__}")
+            BookService.notify_changed(Book(**v) for v in values)
+            inserted += len(values)
+            batch.clear()
+
+        for row_no, payload, error in rows:
+            if error is None:
+                try:
+                    batch.append((row_no, BookService._book_values(owner_id, payload)))
+                except (KeyError, TypeError, ValueError, ArithmeticError) as e:
+                    error = str(e)
+            if error is not None:
+                report(row_no, error)
+                continue
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+        return {"inserted": inserted, "failed": failed, "errors": errors}
+
     # ---------- List / Search ----------
     @staticmethod
     def list(
@@ -64,7 +174,16 @@ class BookService:
         category: Optional[str] = None,
         owner_id: Optional[str] = None,
         status: Optional[str] = None,
-    ) -> Tuple[List[Book], int]:
+        cursor: Optional[str] = None,
+        include_total: Optional[bool] = None,
+        columns: Optional[Iterable[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Page through books, newest first.
+        With `cursor` (the `next_cursor` of the previous page) the page is fetched by keyset
+        on (date_added, id) instead of OFFSET, and the total is skipped unless asked for.
+        `columns` limits which Book attributes are loaded (see _project).
+        """
         stmt = select(Book)
 
         if q:
@@ -79,26 +198,135 @@ class BookService:
         if status:
             stmt = stmt.where(Book.status == status)
 
-        # Calculate total first, then fetch items with pagination
-        total = db.execute(
-            select(func.count()).select_from(stmt.subquery())
-        ).scalar_one()
-        items = db.execute(
-            stmt.order_by(Book.date_added.desc())
-                .offset((page - 1) * page_size)
-                .limit(page_size)
-        ).scalars().all()
-        return items, total
+        if include_total is None:
+            include_total = cursor is None
+        total = None
+        if include_total:
+            key = book_counts.key(
+                "list", q=q, author=author, category=category, owner_id=owner_id, status=status
+            )
+            total = book_counts.exact(db, key, stmt)
+
+        stmt = BookService._project(stmt, columns, "newest")
+        items, next_cursor = BookService._fetch_page(db, [stmt], "newest", page, page_size, cursor)
+        return {"items": items, "total": total, "next_cursor": next_cursor}
+
+    @staticmethod
+    def _project(stmt, columns: Optional[Iterable[str]], sort: Optional[str] = None):
+        """
+        Load only `columns` (Book attribute names) for the rows of `stmt`, plus the id, the
+        update_date the HTTP validators need and the sort key the cursor needs.
+        Leaves the TEXT/JSON columns out of the query when unused.
+        """
+        if not columns:
+            return stmt
+        names = {"id", "update_date", *columns}
+        if sort:
+            names.add(BookService._sort_key(sort).key)
+        return stmt.options(load_only(*(getattr(Book, name) for name in sorted(names))))
+
+    # ---------- Keyset pagination ----------
+    @staticmethod
+    def effective_price(sale_price, deposit) -> Decimal:
+        """Price used for sorting and price ranges: the sale price, else the deposit, else 0."""
+        price = sale_price if sale_price is not None else deposit
+        return Decimal(str(price)) if price is not None else Decimal("0")
+
+    @staticmethod
+    def _sort_key(sort: str):
+        """Column a sort mode orders by; Book.id breaks ties."""
+        if sort in ("price_asc", "price_desc"):
+            return Book.effective_price
+        return Book.date_added
+
+    @staticmethod
+    def _sort_value(sort: str, b: Book):
+        if sort in ("price_asc", "price_desc"):
+            return b.effective_price
+        return b.date_added
+
+    @staticmethod
+    def _cursor_value(sort: str, raw: Any):
+        """Sort key read back from a cursor, in the column's type; ValueError/TypeError if it is not one."""
+        if sort in ("price_asc", "price_desc"):
+            if isinstance(raw, bool):
+                raise TypeError("boolean price")
+            value = Decimal(str(raw))
+            if not value.is_finite():
+                raise ValueError("non-finite price")
+            return value
+        return datetime.fromisoformat(raw)
+
+    @staticmethod
+    def _fetch_page(
+        db: Session, parts: List[Any], sort: str, page: int, page_size: int, cursor: Optional[str]
+    ) -> Tuple[List[Book], Optional[str]]:
+        """
+        Order the rows of `parts` (statements over disjoint rows, see _candidate_parts) by the
+        sort key and id, then take one page by cursor (keyset) or by OFFSET.
+        Several parts are each read up to the end of the page and merged.
+        One extra row is fetched to know whether a next page exists.
+        """
+        key = BookService._sort_key(sort)
+        ascending = sort == "price_asc"
+        offset = 0
+        if cursor:
+            value, last_id = decode_cursor(cursor, sort, lambda raw: BookService._cursor_value(sort, raw))
+
+        ordered = []
+        for stmt in parts:
+            if cursor:
+                if ascending:
+                    stmt = stmt.where(or_(key > value, and_(key == value, Book.id > last_id)))
+                else:
+                    stmt = stmt.where(or_(key < value, and_(key == value, Book.id < last_id)))
+            else:
+                offset = (page - 1) * page_size
+            if ascending:
+                stmt = stmt.order_by(key.asc(), Book.id.asc())
+            else:
+                stmt = stmt.order_by(key.desc(), Book.id.desc())
+            ordered.append(stmt)
+
+        if len(ordered) == 1:
+            rows = db.execute(ordered[0].offset(offset).limit(page_size + 1)).scalars().all()
+        else:
+            rows = [b for stmt in ordered for b in db.execute(stmt.limit(offset + page_size + 1)).scalars()]
+            rows.sort(key=lambda b: (BookService._sort_value(sort, b), b.id), reverse=not ascending)
+            rows = rows[offset:offset + page_size + 1]
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            next_cursor = encode_cursor(sort, BookService._sort_value(sort, last), last.id)
+        return rows, next_cursor
 
     # ---------- Get ----------
     @staticmethod
-    def get(db: Session, book_id: str) -> Book:
-        book = db.get(Book, book_id)
+    def get(db: Session, book_id: str, columns: Optional[Iterable[str]] = None) -> Book:
+        if columns:
+            stmt = BookService._project(select(Book).where(Book.id == book_id), columns)
+            book = db.execute(stmt).scalar_one_or_none()
+        else:
+            book = db.get(Book, book_id)
         if not book:
             from fastapi import HTTPException
             raise HTTPException(status_code=404, detail="Book not found")
         return book
 
+    @staticmethod
+    def get_version(db: Session, book_id: str) -> datetime:
+        """update_date of a book, read alone so conditional GETs can be answered without the row."""
+        row = db.execute(select(Book.update_date).where(Book.id == book_id)).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Book not found")
+        return row[0]
+
+    @staticmethod
+    def last_modified(rows: Iterable[Book]) -> Optional[datetime]:
+        """Latest update_date among `rows`, for list/search validators."""
+        return max((b.update_date for b in rows if b.update_date is not None), default=None)
+
     # ---------- Update ----------
     @staticmethod
     def update(db: Session, book_id: str, owner_id: str, payload: Dict[str, Any]) -> Book:
@@ -106,6 +334,8 @@ class BookService:
         if book.owner_id != owner_id:
             from fastapi import HTTPException
             raise HTTPException(status_code=403, detail="Not the owner")
+        old_status = book.status
+        was_listed = old_status == "listed"
 
         # Allow partial updates (only overwrite fields that are provided)
         updatable = {
@@ -117,14 +347,87 @@ class BookService:
         for k, v in payload.items():
             if k in updatable:
                 setattr(book, k, v)
+        if "isbn" in payload:
+            book.isbn13 = to_isbn13(book.isbn)
+        if "sale_price" in payload or "deposit" in payload:
+            book.effective_price = BookService.effective_price(book.sale_price, book.deposit)
 
         # Make update_date reflect the update
         book.update_date = datetime.utcnow()
         db.add(book)
+        delta = InventoryDelta()
+        delta.book_status(owner_id, old_status, book.status)
+        delta.apply(db)
         db.commit()
         db.refresh(book)
+        BookService._after_write(book, newly_listed=not was_listed and book.status == "listed")
         return book
 
+    # ---------- Bulk update ----------
+    BULK_UPDATABLE = {"status", "sale_price", "deposit", "can_rent", "can_sell"}
+
+    @staticmethod
+    def bulk_update(db: Session, owner_id: str, items: List[Tuple[str, Dict[str, Any]]]) -> List[Book]:
+        """
+        Apply partial status/price patches to many books in one transaction.
+        Ownership of every book is checked with a single query; rows sharing the same patch are
+        changed by one set-based UPDATE. Caches/indexes are refreshed once for the whole batch.
+        """
+        # Later patches for the same book win, field by field
+        patches: Dict[str, Dict[str, Any]] = {}
+        for book_id, patch in items:
+            unknown = set(patch) - BookService.BULK_UPDATABLE
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Fields not allowed in bulk update: {sorted(unknown)}")
+            patches.setdefault(book_id, {}).update(patch)
+        if not patches:
+            return []
+
+        current = db.execute(
+            select(Book.id, Book.owner_id, Book.status).where(Book.id.in_(list(patches)))
+        ).all()
+        owners = {row.id: row.owner_id for row in current}
+        old_status = {row.id: row.status for row in current}
+        was_listed = {row.id for row in current if row.status == "listed"}
+        missing = [book_id for book_id in patches if book_id not in owners]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Books not found: {missing}")
+        if any(owner != owner_id for owner in owners.values()):
+            raise HTTPException(status_code=403, detail="Not the owner")
+
+        groups: Dict[Tuple, List[str]] = {}
+        for book_id, patch in patches.items():
+            if patch:
+                groups.setdefault(tuple(sorted(patch.items())), []).append(book_id)
+
+        now = datetime.utcnow()
+        for patch_items, ids in groups.items():
+            values: Dict[str, Any] = dict(patch_items)
+            if "sale_price" in values or "deposit" in values:
+                # New value where patched, current column otherwise
+                values["effective_price"] = func.coalesce(
+                    values["sale_price"] if "sale_price" in values else Book.sale_price,
+                    values["deposit"] if "deposit" in values else Book.deposit,
+                    0,
+                )
+            values["update_date"] = now
+            db.execute(
+                update(Book).where(Book.id.in_(ids)).values(**values)
+                .execution_options(synchronize_session=False)
+            )
+        delta = InventoryDelta()
+        for book_id, patch in patches.items():
+            if "status" in patch:
+                delta.book_status(owner_id, old_status[book_id], patch["status"])
+        delta.apply(db)
+        db.commit()
+
+        books = db.execute(select(Book).where(Book.id.in_(list(patches)))).scalars().all()
+        BookService._after_write_many(
+            books, newly_listed=[b for b in books if b.status == "listed" and b.id not in was_listed]
+        )
+        return books
+
     # ---------- Delete ----------
     @staticmethod
     def delete(db: Session, book_id: str, owner_id: str) -> None:
@@ -133,45 +436,210 @@ class BookService:
             from fastapi import HTTPException
             raise HTTPException(status_code=403, detail="Not the owner")
         db.delete(book)
+        delta = InventoryDelta()
+        delta.book_status(owner_id, book.status, None)
+        delta.apply(db)
         db.commit()
+        BookService._after_delete(book_id)
+
+    # ---------- Backfill ----------
+    @staticmethod
+    def backfill_isbn13(db: Session, batch_size: int = 500) -> int:
+        """Fill isbn13 for rows written before the column existed. Returns the number of rows updated."""
+        updated = 0
+        last_id = ""
+        while True:
+            rows = db.execute(
+                select(Book.id, Book.isbn)
+                .where(Book.isbn13.is_(None), Book.isbn.isnot(None), Book.id > last_id)
+                .order_by(Book.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            values = [
+                {"b_id": row.id, "b_isbn13": isbn13}
+                for row in rows
+                if (isbn13 := to_isbn13(row.isbn))
+            ]
+            if values:
+                db.execute(
+                    update(Book.__table__)
+                    .where(Book.__table__.c.id == bindparam("b_id"))
+                    .values(isbn13=bindparam("b_isbn13")),
+                    values,
+                )
+                db.commit()
+                updated += len(values)
+        return updated
+
+    @staticmethod
+    def backfill_effective_price(db: Session, batch_size: int = 500) -> int:
+        """
+        Fill effective_price for rows written before the column existed (left at its default 0).
+        Returns the number of rows updated.
+        """
+        price = func.coalesce(Book.sale_price, Book.deposit, 0)
+        updated = 0
+        last_id = ""
+        while True:
+            ids = db.execute(
+                select(Book.id)
+                .where(Book.effective_price == 0, price != 0, Book.id > last_id)
+                .order_by(Book.id)
+                .limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            last_id = ids[-1]
+            db.execute(
+                update(Book)
+                .where(Book.id.in_(ids))
+                # A derived column, not an edit: keep update_date (and so the HTTP validators) as is
+                .values(effective_price=price, update_date=Book.update_date)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            updated += len(ids)
+        return updated
+
+    # ---------- Index maintenance ----------
+    @staticmethod
+    def _after_write(book: Book, newly_listed: bool = False) -> None:
+        """
+        Keep in-process search structures in step with a committed insert/update.
+        `newly_listed` (the book just became listed) also runs saved-search alerts for it.
+        """
+        BookService._after_write_many([book], [book] if newly_listed else ())
+
+    @staticmethod
+    def _after_write_many(books: Iterable[Book], newly_listed: Iterable[Book] = ()) -> None:
+        """Batch form of _after_write: per-book index updates, shared caches invalidated once."""
+        for book in books:
+            search_index.upsert(book)
+            trigram_index.upsert(book)
+            suggest_index.upsert(book)
+            filter_options_cache.apply(book)
+        book_counts.invalidate()
+        search_cache.invalidate()
+        saved_search_index.on_listed(newly_listed)
+
+    @staticmethod
+    def _after_delete(book_id: str) -> None:
+        search_index.remove(book_id)
+        trigram_index.remove(book_id)
+        suggest_index.remove(book_id)
+        book_counts.invalidate()
+        search_cache.invalidate()
+        filter_options_cache.remove(book_id)
+
+    @staticmethod
+    def notify_changed(books: Iterable[Book]) -> None:
+        """
+        For code outside BookService that changes books directly (e.g. OrderService setting
+        status to lent/sold/listed): call after commit so caches and indexes catch up.
+        Books passed in as "listed" are treated as newly listed (saved-search alerts run),
+        so only pass books whose status actually changed.
+        """
+        books = list(books)
+        BookService._after_write_many(books, [b for b in books if b.status == "listed"])
 
     # ---------- Search ----------
     @staticmethod
-    def search_books(
+    def _fuzzy_terms(db: Session, tokens: List[str]) -> Fuzzy:
+        """
+        Typo tolerance: for each query term that prefixes no indexed word, the most similar
+        title/author words from the trigram index, searched in its place.
+        """
+        fuzzy: Fuzzy = {}
+        for tok in tokens:
+            for term in query_terms(tok):
+                if term not in fuzzy and not search_index.has_prefix(db, term):
+                    fuzzy[term] = trigram_index.similar(db, term)
+        return fuzzy
+
+    @staticmethod
+    def _candidate_parts(stmt, candidate_ids: Optional[set]) -> List[Any]:
+        """
+        `stmt` restricted to the keyword candidates, as statements over disjoint rows: one IN
+        list per CANDIDATE_IN_LIMIT candidates, in id order, so the parts of an id-ordered
+        export concatenate in order. Just [stmt] for a search without keywords.
+        """
+        if candidate_ids is None:
+            return [stmt]
+        ids = sorted(candidate_ids)
+        return [
+            stmt.where(Book.id.in_(ids[start:start + CANDIDATE_IN_LIMIT]))
+            for start in range(0, len(ids), CANDIDATE_IN_LIMIT)
+        ]
+
+    @staticmethod
+    def _top_matching(
+        db: Session, stmt, tokens: List[str], candidate_ids: set, k: int,
+        after: Optional[Tuple[float, str]], fuzzy: Fuzzy,
+    ) -> List[Tuple[float, str]]:
+        """
+        Best k (score, id) of `candidate_ids` that also pass the filters of `stmt`, best first.
+        Ranks in the index first, then checks the ranked ids against SQL a batch at a time,
+        so no IN list is longer than CANDIDATE_IN_LIMIT however many books match.
+        """
+        found: List[Tuple[float, str]] = []
+        batch = min(max(2 * k, 100), CANDIDATE_IN_LIMIT)
+        while len(found) < k:
+            ranked = search_index.top_k(db, tokens, candidate_ids, batch, after=after, fuzzy=fuzzy)
+            if not ranked:
+                break
+            passing = set(db.execute(
+                stmt.with_only_columns(Book.id).where(Book.id.in_([book_id for _, book_id in ranked]))
+            ).scalars())
+            found.extend(pair for pair in ranked if pair[1] in passing)
+            if len(ranked) < batch:
+                break
+            after = ranked[-1]
+            batch = min(2 * batch, CANDIDATE_IN_LIMIT)
+        return found[:k]
+
+    @staticmethod
+    def _search_stmt(
         db: Session, *, q: Optional[str], lang: Optional[str], category: Optional[str],
         status: str, can_rent: Optional[bool], can_sell: Optional[bool],
         delivery: Optional[str], min_price: Optional[float], max_price: Optional[float],
-        sort: Literal["relevance","newest","price_asc","price_desc"],
-        page: int, page_size: int
-    ) -> Tuple[list[dict], int]:
-
+        near: Optional[Point] = None, radius_km: Optional[float] = None,
+    ) -> Tuple[Any, List[str], Optional[set], Fuzzy]:
+        """
+        Build the filtered (unordered) select(Book) shared by search, facets and export.
+        Returns (stmt, keyword tokens, keyword candidate ids, typo alternatives used for them);
+        stmt is None when the keywords (or the `near`/`radius_km` circle) match no book at all.
+        The keyword candidates are not part of stmt: apply them with _candidate_parts,
+        or check ids against them, so no IN list grows with the number of matches.
+        """
         stmt = select(Book)
 
         # Status
         if status != "all":
             stmt = stmt.where(Book.status == status)
 
-        # Compound keywords (title/author/description/ISBN)
-        if q:
-            tokens = [t for t in shlex.split(q.strip()) if t]
-            # From database book table remove '-', ' ' from ISBN to pure digits
-            isbn_norm = func.replace(func.replace(Book.isbn, '-', ''), ' ', '')
-
-            for tok in tokens:
-                like = f"%{tok}%"
-                tok_digits = re.sub(r"\D", "", tok)  # An digits-only token for ISBN searching
-
-                per_token_or = or_(
-                    Book.title_or.ilike(like),
-                    Book.title_en.ilike(like),
-                    Book.author.ilike(like),
-                    Book.description.ilike(like),
-
-                    # Use both LIKE and == to query ISBN
-                    Book.isbn.ilike(like),
-                    (isbn_norm == tok_digits) if tok_digits and len(tok_digits) in (10, 13) else False,
-                )
-                stmt = stmt.where(per_token_or)
+        # Compound keywords (title/author/description/ISBN), resolved by the inverted index.
+        # A query that is exactly one valid ISBN (barcode scan) is answered by an index seek on isbn13.
+        tokens = [t for t in shlex.split(q.strip()) if t] if q else []
+        candidate_ids = None
+        fuzzy: Fuzzy = {}
+        isbn13 = to_isbn13(tokens[0]) if len(tokens) == 1 else None
+        if isbn13:
+            stmt = stmt.where(Book.isbn13 == isbn13)
+        elif tokens:
+            fuzzy = BookService._fuzzy_terms(db, tokens)
+            candidate_ids = search_index.candidates(db, tokens, fuzzy)
+            if not candidate_ids:
+                return None, tokens, candidate_ids, fuzzy
+
+        # Proximity: owners located within the radius, found through the owner grid
+        if near is not None and radius_km is not None:
+            owner_ids = owner_geo_index.within(db, near, radius_km)
+            if not owner_ids:
+                return None, tokens, candidate_ids, fuzzy
+            stmt = stmt.where(Book.owner_id.in_(list(owner_ids)))
 
         # Language
         if lang:
@@ -198,70 +666,409 @@ class BookService:
                 Book.delivery_method == "both"
             ))
 
-        # Price range (sale_price OR rent deposit)
+        # Price range on the effective price (sale price, else rent deposit): an index range scan
         if min_price is not None:
-            stmt = stmt.where(or_(
-                Book.sale_price >= min_price,
-                Book.deposit    >= min_price
-            ))
+            stmt = stmt.where(Book.effective_price >= min_price)
         if max_price is not None:
-            stmt = stmt.where(or_(
-                Book.sale_price <= max_price,
-                Book.deposit    <= max_price
-            ))
+            stmt = stmt.where(Book.effective_price <= max_price)
+        return stmt, tokens, candidate_ids, fuzzy
 
-        # Ordering
-        if sort == "newest":
-            stmt = stmt.order_by(Book.date_added.desc())
-        elif sort == "price_asc":
-            stmt = stmt.order_by(func.coalesce(Book.sale_price, Book.deposit).asc())
-        elif sort == "price_desc":
-            stmt = stmt.order_by(func.coalesce(Book.sale_price, Book.deposit).desc())
-        else:
-            stmt = stmt.order_by(Book.date_added.desc())
+    @staticmethod
+    def search_books(
+        db: Session, *, q: Optional[str], lang: Optional[str], category: Optional[str],
+        status: str, can_rent: Optional[bool], can_sell: Optional[bool],
+        delivery: Optional[str], min_price: Optional[float], max_price: Optional[float],
+        sort: Literal["relevance","newest","price_asc","price_desc","distance"],
+        page: int, page_size: int,
+        cursor: Optional[str] = None, include_total: Optional[bool] = None,
+        count_mode: Literal["exact","estimate","auto"] = "auto",
+        with_facets: bool = False,
+        near: Optional[str] = None, radius_km: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Returns {"items", "total", "total_exact", "next_cursor", "last_modified"}
+        (+ "facets" when requested); "last_modified" is the newest update_date on the page.
+        Pass the previous page's `next_cursor` as `cursor` for keyset pagination; in that mode
+        `total` is None unless `include_total` is set (relevance ranking knows it unless the
+        keywords match more than CANDIDATE_IN_LIMIT books).
+        `count_mode` decides whether broad queries may report an estimated total.
+        `near` is a postcode: items then carry "distanceKm" to the owner's postcode, and
+        `radius_km` / sort="distance" filter and order by it.
+        """
+        if include_total is None:
+            include_total = cursor is None
 
-        # Total
-        total = db.execute(select(func.count()).select_from(stmt.subquery())).scalar() or 0
+        origin = None
+        if near is not None:
+            origin = BookService._origin(near)
+        elif sort == "distance" or radius_km is not None:
+            raise HTTPException(status_code=400, detail="near (postcode) is required for distance search")
+        if origin is None:
+            # No known location to measure from: search as if no distance was asked for
+            radius_km = None
+            if sort == "distance":
+                sort = "relevance"
 
-        # Pagination
-        offset = (page - 1) * page_size
-        rows = db.execute(stmt.offset(offset).limit(page_size)).scalars().all()
-
-        # Transfer to frontend structure
-        def to_read(b: Book):
-            return {
-                "id": b.id,
-                "titleOr": b.title_or,
-                "author": b.author,
-                "status": b.status,
-                "coverImgUrl": b.cover_img_url,
-                "canRent": b.can_rent,
-                "canSell": b.can_sell,
-                "deposit": float(b.deposit) if b.deposit is not None else None,
-                "salePrice": float(b.sale_price) if b.sale_price is not None else None,
-                "deliveryMethod": b.delivery_method,
-                "ownerId": b.owner_id,
-                "createdAt": b.date_added,
+        stmt, tokens, candidate_ids, fuzzy = BookService._search_stmt(
+            db, q=q, lang=lang, category=category, status=status, can_rent=can_rent,
+            can_sell=can_sell, delivery=delivery, min_price=min_price, max_price=max_price,
+            near=origin, radius_km=radius_km,
+        )
+        if stmt is None:
+            empty = {"items": [], "total": 0, "total_exact": True, "next_cursor": None, "last_modified": None}
+            if with_facets:
+                empty["facets"] = BookService._facet_histograms([])
+            return empty
+        parts = BookService._candidate_parts(stmt, candidate_ids)
+        facets = BookService.facets(db, parts) if with_facets else None
+
+        count_key = book_counts.key(
+            "search",
+            terms=tuple(sorted({term for tok in tokens for term in query_terms(tok)})) or None,
+            status=status, lang=lang, category=category, can_rent=can_rent, can_sell=can_sell,
+            delivery=delivery if delivery != "any" else None, min_price=min_price, max_price=max_price,
+            near=normalize_postcode(near) if radius_km is not None else None, radius_km=radius_km,
+        )
+
+        # Distance: filter in SQL, reading only books of owners near the page's position
+        if sort == "distance":
+            rows, next_cursor = BookService._distance_page(
+                db, stmt, candidate_ids, origin, radius_km, page, page_size, cursor
+            )
+            total, total_exact = None, None
+            if include_total:
+                total, total_exact = book_counts.resolve(db, count_key, parts, count_mode)
+            result = {
+                "items": BookService._search_items(db, rows, origin),
+                "total": total,
+                "total_exact": total_exact,
+                "next_cursor": next_cursor,
+                "last_modified": BookService.last_modified(rows),
             }
-        return [to_read(b) for b in rows], total
+            if facets is not None:
+                result["facets"] = facets
+            return result
+
+        # Relevance: filter in SQL, rank the surviving ids with BM25 and keep only the top k.
+        # Broad queries rank all candidates in the index first and filter only the best ones.
+        if sort == "relevance" and tokens:
+            after = None
+            offset = 0
+            if cursor:
+                after = decode_cursor(cursor, "relevance", finite_float)
+            else:
+                offset = (page - 1) * page_size
+            if candidate_ids is not None and len(candidate_ids) > CANDIDATE_IN_LIMIT:
+                ranked = BookService._top_matching(
+                    db, stmt, tokens, candidate_ids, offset + page_size + 1, after, fuzzy
+                )[offset:]
+                total, total_exact = None, None
+                if include_total:
+                    total, total_exact = book_counts.resolve(
+                        db, count_key, parts, count_mode, candidate_count=len(candidate_ids)
+                    )
+            else:
+                matched_ids = db.execute(parts[0].with_only_columns(Book.id)).scalars().all()
+                ranked = search_index.top_k(
+                    db, tokens, matched_ids, offset + page_size + 1, after=after, fuzzy=fuzzy
+                )[offset:]
+                total, total_exact = len(matched_ids), True
+                book_counts.remember(count_key, total)
+
+            next_cursor = None
+            if len(ranked) > page_size:
+                ranked = ranked[:page_size]
+                next_cursor = encode_cursor("relevance", *ranked[-1])
+            page_ids = [book_id for _, book_id in ranked]
+            by_id = {
+                b.id: b for b in db.execute(
+                    BookService._project(select(Book).where(Book.id.in_(page_ids)), SEARCH_READ_COLUMNS)
+                ).scalars()
+            } if page_ids else {}
+            rows = [by_id[i] for i in page_ids if i in by_id]
+            result = {
+                "items": BookService._search_items(db, rows, origin),
+                "total": total,
+                "total_exact": total_exact,
+                "next_cursor": next_cursor,
+                "last_modified": BookService.last_modified(rows),
+            }
+            if facets is not None:
+                result["facets"] = facets
+            return result
+
+        # Without keywords there is nothing to rank, so relevance falls back to newest
+        if sort not in ("newest", "price_asc", "price_desc"):
+            sort = "newest"
+
+        # Total (cached exact count, or an estimate for broad queries)
+        total, total_exact = None, None
+        if include_total:
+            unfiltered = count_key == book_counts.key("search", status="all")
+            total, total_exact = book_counts.resolve(
+                db, count_key, parts, count_mode,
+                candidate_count=len(candidate_ids) if candidate_ids is not None else None,
+                unfiltered=unfiltered,
+            )
+
+        # Pagination
+        parts = [BookService._project(part, SEARCH_READ_COLUMNS, sort) for part in parts]
+        rows, next_cursor = BookService._fetch_page(db, parts, sort, page, page_size, cursor)
+        result = {
+            "items": BookService._search_items(db, rows, origin),
+            "total": total,
+            "total_exact": total_exact,
+            "next_cursor": next_cursor,
+            "last_modified": BookService.last_modified(rows),
+        }
+        if facets is not None:
+            result["facets"] = facets
+        return result
 
-    # ---------- Get Filter Options ----------
     @staticmethod
-    def get_filter_options(db: Session) -> Dict[str, List[str]]:
-        """Get all unique categories and languages from books with 'listed' status."""
-        # Get unique categories from listed books only
-        categories_stmt = select(Book.category).distinct().where(
-            and_(Book.category.isnot(None), Book.status == "listed")
-        )
-        categories = db.execute(categories_stmt).scalars().all()
+    def search_books_cached(db: Session, **params: Any) -> Dict[str, Any]:
+        """
+        search_books through the shared result cache, for anonymous callers (the result must
+        not depend on who asks). Identical concurrent misses share one execution.
+        Returns a shallow copy, so callers may pop/add top-level keys.
+        """
+        key = search_cache.key(**params)
+        return dict(search_cache.get_or_compute(key, lambda: BookService.search_books(db, **params)))
 
-        # Get unique languages from listed books only
-        languages_stmt = select(Book.original_language).distinct().where(
-            and_(Book.original_language.isnot(None), Book.status == "listed")
+    # ---------- Export ----------
+    @staticmethod
+    def export_parts(
+        db: Session, *, q: Optional[str], lang: Optional[str], category: Optional[str],
+        can_rent: Optional[bool], can_sell: Optional[bool], delivery: Optional[str],
+        min_price: Optional[float], max_price: Optional[float],
+        near: Optional[str] = None, radius_km: Optional[float] = None,
+    ):
+        """
+        Statements for exporting listed books with the search filters, each ordered by id and
+        together in id order (see _candidate_parts). Built (and validated) up front so bad
+        filters fail before streaming starts; None when nothing matches.
+        """
+        origin = None
+        if near is not None:
+            origin = BookService._origin(near)
+        elif radius_km is not None:
+            raise HTTPException(status_code=400, detail="near (postcode) is required for distance search")
+        if origin is None:
+            radius_km = None
+        stmt, _, candidate_ids, _ = BookService._search_stmt(
+            db, q=q, lang=lang, category=category, status="listed", can_rent=can_rent,
+            can_sell=can_sell, delivery=delivery, min_price=min_price, max_price=max_price,
+            near=origin, radius_km=radius_km,
         )
-        languages = db.execute(languages_stmt).scalars().all()
+        if stmt is None:
+            return None
+        return [part.order_by(Book.id) for part in BookService._candidate_parts(stmt, candidate_ids)]
+
+    @staticmethod
+    def stream_rows(db: Session, parts: List[Any], columns: Iterable[str], batch_size: int = 1000) -> Iterator[Any]:
+        """
+        Yield rows of each statement in `parts` in turn, restricted to `columns`, each through
+        a server-side cursor. Plain column rows (not ORM entities) keep the identity map empty,
+        so memory stays constant however many books are exported.
+        """
+        columns = [getattr(Book, c) for c in columns]
+        for stmt in parts:
+            result = db.execute(
+                stmt.with_only_columns(*columns),
+                execution_options={"stream_results": True, "yield_per": batch_size},
+            )
+            try:
+                yield from result
+            finally:
+                result.close()
+
+    # ---------- Facets ----------
+    @staticmethod
+    def _price_bucket_expr():
+        # Same column the minPrice/maxPrice filters use, so bucket counts agree with them
+        whens = [
+            (Book.effective_price < high, f"{low}-{high}") for low, high in PRICE_BUCKETS if high is not None
+        ]
+        return case(*whens, else_=f"{PRICE_BUCKETS[-1][0]}+")
+
+    @staticmethod
+    def facets(db: Session, parts: List[Any]) -> Dict[str, Dict[str, int]]:
+        """
+        Per-value counts for category, language, delivery method, rent/sell flags and price
+        bucket over the filtered set (the rows of `parts`), from one GROUP BY query per part
+        instead of one search per value.
+        """
+        bucket = BookService._price_bucket_expr().label("price_bucket")
+        dims = (Book.category, Book.original_language, Book.delivery_method, Book.can_rent, Book.can_sell, bucket)
+        rows = [
+            row for stmt in parts
+            for row in db.execute(stmt.with_only_columns(*dims, func.count().label("n")).group_by(*dims))
+        ]
+        return BookService._facet_histograms(rows)
 
+    @staticmethod
+    def _facet_histograms(rows) -> Dict[str, Dict[str, int]]:
+        # Roll the grouped combinations up into one histogram per facet
+        facets: Dict[str, Dict[str, int]] = {
+            "category": {}, "language": {}, "delivery": {}, "canRent": {}, "canSell": {}, "price": {},
+        }
+        for category, language, delivery, can_rent, can_sell, price_bucket, n in rows:
+            for name, value in (
+                ("category", category), ("language", language), ("delivery", delivery),
+                ("canRent", "true" if can_rent else "false"),
+                ("canSell", "true" if can_sell else "false"),
+                ("price", price_bucket),
+            ):
+                if value is None:
+                    continue
+                facets[name][value] = facets[name].get(value, 0) + n
+        return facets
+
+    # Owners without a known location sort after everyone else
+    UNKNOWN_DISTANCE = 1e9
+
+    @staticmethod
+    def _origin(near: str) -> Optional[Point]:
+        """
+        Centroid of the `near` postcode; 400 if it is not a postcode at all.
+        None for a valid postcode missing from the centroid table, so callers ignore proximity
+        instead of rejecting it.
+        """
+        if normalize_postcode(near) is None:
+            raise HTTPException(status_code=400, detail=f"Invalid postcode: {near}")
+        return postcodes.centroid(near)
+
+    @staticmethod
+    def _distance_page(
+        db: Session, stmt, candidate_ids: Optional[set], origin: Point, radius_km: Optional[float],
+        page: int, page_size: int, cursor: Optional[str],
+    ) -> Tuple[List[Book], Optional[str]]:
+        """
+        Page of `stmt` (limited to `candidate_ids`, if any) ordered by (owner distance, id),
+        by cursor or offset.
+        Walks owners outward from the page's position through the owner grid, reading
+        (id, owner_id) only for books of owners inside the circle searched so far and widening
+        it until the page is full, so a page costs the books around it rather than every match.
+        Books whose owner has no known location come last, by id.
+        """
+        after = None
+        offset = 0
+        if cursor:
+            after = decode_cursor(cursor, "distance", finite_float)
+        else:
+            offset = (page - 1) * page_size
+        need = offset + page_size + 1
+        # Distances are rounded into the cursor, so start just short of it
+        min_km = max(after[0] - 0.001, 0.0) if after else 0.0
+
+        dist: Dict[str, float] = {}
+        ranked: List[Tuple[float, str]] = []
+        count = need
+        while True:
+            owners, reach = owner_geo_index.nearest(db, origin, count, min_km=min_km, max_km=radius_km)
+            new = [owner for owner in owners if owner not in dist]
+            for owner in new:
+                dist[owner] = round(owners[owner], 3)
+            for start in range(0, len(new), CANDIDATE_IN_LIMIT):
+                chunk = new[start:start + CANDIDATE_IN_LIMIT]
+                for book_id, owner in db.execute(
+                    stmt.with_only_columns(Book.id, Book.owner_id).where(Book.owner_id.in_(chunk))
+                ):
+                    pair = (dist[owner], book_id)
+                    if (after is None or pair > after) and (candidate_ids is None or book_id in candidate_ids):
+                        ranked.append(pair)
+            # Owners not read yet are all farther than `reach`, so only books closer than it are in place
+            settled = [pair for pair in ranked if pair[0] < round(reach, 3)]
+            if len(settled) >= need or reach == math.inf:
+                break
+            count = 2 * len(owners)
+        ranked = heapq.nsmallest(need, settled)
+
+        if len(ranked) < need and radius_km is None:
+            # Past every located owner: books whose owner has no known location
+            tail = stmt.with_only_columns(Book.id).where(Book.owner_id.in_(owner_geo_index.unlocated()))
+            if after is not None and after[0] >= BookService.UNKNOWN_DISTANCE:
+                tail = tail.where(Book.id > after[1])
+            for part in BookService._candidate_parts(tail, candidate_ids):
+                if len(ranked) >= need:
+                    break
+                ranked += [
+                    (BookService.UNKNOWN_DISTANCE, book_id)
+                    for book_id in db.execute(part.order_by(Book.id).limit(need - len(ranked))).scalars()
+                ]
+        ranked = ranked[offset:]
+
+        next_cursor = None
+        if len(ranked) > page_size:
+            ranked = ranked[:page_size]
+            next_cursor = encode_cursor("distance", *ranked[-1])
+        page_ids = [book_id for _, book_id in ranked]
+        by_id = {
+            b.id: b for b in db.execute(
+                BookService._project(select(Book).where(Book.id.in_(page_ids)), SEARCH_READ_COLUMNS)
+            ).scalars()
+        } if page_ids else {}
+        return [by_id[i] for i in page_ids if i in by_id], next_cursor
+
+    @staticmethod
+    def _search_items(db: Session, rows: List[Book], origin: Optional[Point]) -> List[dict]:
+        items = [BookService._to_search_read(b) for b in rows]
+        if origin is not None:
+            dist = owner_geo_index.distances(db, origin, (b.owner_id for b in rows))
+            for item in items:
+                d = dist.get(item["ownerId"])
+                item["distanceKm"] = round(d, 1) if d is not None else None
+        return items
+
+    @staticmethod
+    def _to_search_read(b: Book) -> dict:
+        """Transfer to frontend structure"""
         return {
-            "categories": sorted([c for c in categories if c]),
-            "languages": sorted([l for l in languages if l])
-        }
\ No newline at end of file
+            "id": b.id,
+            "titleOr": b.title_or,
+            "author": b.author,
+            "status": b.status,
+            "coverImgUrl": b.cover_img_url,
+            "canRent": b.can_rent,
+            "canSell": b.can_sell,
+            "deposit": float(b.deposit) if b.deposit is not None else None,
+            "salePrice": float(b.sale_price) if b.sale_price is not None else None,
+            "deliveryMethod": b.delivery_method,
+            "ownerId": b.owner_id,
+            "createdAt": b.date_added,
+        }
+
+    # ---------- Similar books ----------
+    @staticmethod
+    def similar(db: Session, book_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Listed neighbours of a book from the precomputed book_similarity table,
+        best first: one range read on its (book_id, rank) key joined to book by id.
+        """
+        stmt = BookService._project(
+            select(Book, BookSimilarity.score)
+            .join(BookSimilarity, BookSimilarity.similar_book_id == Book.id)
+            .where(BookSimilarity.book_id == book_id, Book.status == "listed")
+            .order_by(BookSimilarity.rank)
+            .limit(limit),
+            SEARCH_READ_COLUMNS,
+        )
+        rows = db.execute(stmt).all()
+        if not rows:
+            BookService.get_version(db, book_id)  # 404 for unknown books
+        return [{**BookService._to_search_read(b), "score": round(score, 4)} for b, score in rows]
+
+    # ---------- Suggest ----------
+    @staticmethod
+    def suggest(db: Session, prefix: str, limit: int = 10, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Typeahead over titles/authors/categories of listed books, served from memory."""
+        return suggest_index.suggest(db, prefix, limit, kind)
+
+    # ---------- Get Filter Options ----------
+    @staticmethod
+    def get_filter_options(db: Session) -> Tuple[Dict[str, Any], str]:
+        """
+        Get all unique categories and languages (with counts) from books with 'listed' status,
+        plus an ETag that changes whenever they do.
+        """
+        return filter_options_cache.options(db)
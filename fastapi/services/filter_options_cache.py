@@ -0,0 +1,108 @@
+"""
+In-process cache of the search page's filter options.
+
+Holds the category and language of every listed book, so the distinct values
+and their counts can be served without the two SELECT DISTINCT scans.
+BookService updates it on every write; `version` changes whenever the
+served options do and is part of the ETag returned with them.
+"""
+
+from collections import Counter
+from typing import Dict, Optional, Tuple
+import threading
+import uuid
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+
+from models.book import Book
+
+
+class FilterOptionsCache:
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._listed: Dict[str, Tuple[Optional[str], Optional[str]]] = {}  # book id -> (category, language)
+        self._categories: Counter = Counter()
+        self._languages: Counter = Counter()
+        self._built = False
+        self._snapshot: Optional[dict] = None
+        # Unique per process start, so ETags from a previous run never match
+        self._epoch = uuid.uuid4().hex[:8]
+        self.version = 0
+
+    # ---------- Build ----------
+    def ensure_built(self, db: Session) -> None:
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+            rows = db.execute(
+                select(Book.id, Book.category, Book.original_language).where(Book.status == "listed")
+            ).all()
+            for row in rows:
+                self._add(row.id, row.category, row.original_language)
+            self._built = True
+            self._changed()
+
+    # ---------- Maintenance ----------
+    def apply(self, book: Book) -> None:
+        """Record the current state of a book after it was created or updated."""
+        with self._lock:
+            if not self._built:
+                return
+            new = (book.category, book.original_language) if book.status == "listed" else None
+            if self._listed.get(book.id) == new:
+                return
+            self._discard(book.id)
+            if new is not None:
+                self._add(book.id, *new)
+            self._changed()
+
+    def remove(self, book_id: str) -> None:
+        with self._lock:
+            if self._built and book_id in self._listed:
+                self._discard(book_id)
+                self._changed()
+
+    # ---------- Query ----------
+    def options(self, db: Session) -> Tuple[dict, str]:
+        """Return the current options and their ETag, taken together under the lock."""
+        self.ensure_built(db)
+        with self._lock:
+            if self._snapshot is None:
+                categories = {c: n for c, n in self._categories.items() if c and n > 0}
+                languages = {l: n for l, n in self._languages.items() if l and n > 0}
+                self._snapshot = {
+                    "categories": sorted(categories),
+                    "languages": sorted(languages),
+                    "categoryCounts": dict(sorted(categories.items())),
+                    "languageCounts": dict(sorted(languages.items())),
+                }
+            return self._snapshot, f'"filter-options-{self._epoch}-{self.version}"'
+
+    # ---------- Internals ----------
+    def _add(self, book_id: str, category: Optional[str], language: Optional[str]) -> None:
+        self._listed[book_id] = (category, language)
+        self._categories[category] += 1
+        self._languages[language] += 1
+
+    def _discard(self, book_id: str) -> None:
+        old = self._listed.pop(book_id, None)
+        if old is None:
+            return
+        category, language = old
+        self._categories[category] -= 1
+        if self._categories[category] <= 0:
+            del self._categories[category]
+        self._languages[language] -= 1
+        if self._languages[language] <= 0:
+            del self._languages[language]
+
+    def _changed(self) -> None:
+        self._snapshot = None
+        self.version += 1
+
+
+# Shared per-process cache
+filter_options_cache = FilterOptionsCache()
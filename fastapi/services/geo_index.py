@@ -0,0 +1,195 @@
+"""
+Postcode proximity for book search.
+
+Postcodes are resolved to centroids from a bundled CSV (data/postcode_centroids.csv,
+or the file named by POSTCODE_CENTROIDS_FILE). Book owners are located by their
+User.zip_code and kept in a uniform lat/lon grid, so "owners within r km" only
+visits the grid cells overlapping the search circle instead of every user.
+"""
+
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import csv
+import math
+import os
+import threading
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, or_
+
+from models.user import User
+
+POSTCODE_FILE = os.getenv(
+    "POSTCODE_CENTROIDS_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "postcode_centroids.csv"),
+)
+
+EARTH_RADIUS_KM = 6371.0
+# Farthest any two points can be apart
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+# Grid cell size in degrees (~28 km north-south)
+CELL_DEG = 0.25
+CELL_KM = math.radians(CELL_DEG) * EARTH_RADIUS_KM
+
+Point = Tuple[float, float]  # (lat, lon)
+
+
+def normalize_postcode(value: Optional[str]) -> Optional[str]:
+    """'  800 ' -> '0800'; None for anything that is not a 3-4 digit postcode."""
+    code = (value or "").strip()
+    if not code.isdigit() or not 3 <= len(code) <= 4:
+        return None
+    return code.zfill(4)
+
+
+def haversine_km(a: Point, b: Point) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(h)))
+
+
+class PostcodeTable:
+    """Postcode -> centroid, loaded once from the bundled CSV."""
+
+    def __init__(self, path: str = POSTCODE_FILE) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._centroids: Optional[Dict[str, Point]] = None
+
+    def centroid(self, postcode: Optional[str]) -> Optional[Point]:
+        code = normalize_postcode(postcode)
+        if code is None:
+            return None
+        return self._load().get(code)
+
+    def spellings(self) -> List[str]:
+        """Every stored zip_code text that resolves to a centroid ('0800' and '800' alike)."""
+        return sorted({form for code in self._load() for form in (code, code.lstrip("0"))})
+
+    def _load(self) -> Dict[str, Point]:
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    centroids: Dict[str, Point] = {}
+                    with open(self.path, newline="", encoding="utf-8") as f:
+                        for row in csv.DictReader(f):
+                            code = normalize_postcode(row.get("postcode"))
+                            if code:
+                                centroids[code] = (float(row["lat"]), float(row["lon"]))
+                    self._centroids = centroids
+        return self._centroids
+
+
+class OwnerGeoIndex:
+    """Owner locations (from User.zip_code) bucketed in a lat/lon grid."""
+
+    def __init__(self, postcodes: PostcodeTable) -> None:
+        self.postcodes = postcodes
+        self._lock = threading.RLock()
+        self._points: Dict[str, Point] = {}                   # user id -> centroid
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}     # grid cell -> user ids
+        self._built = False
+
+    # ---------- Build ----------
+    def ensure_built(self, db: Session) -> None:
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+            rows = db.execute(
+                select(User.user_id, User.zip_code).where(User.zip_code.isnot(None))
+            ).all()
+            for user_id, zip_code in rows:
+                self._set(user_id, zip_code)
+            self._built = True
+
+    # ---------- Maintenance ----------
+    def set_owner(self, user_id: str, zip_code: Optional[str]) -> None:
+        """Call after a user's zip_code changes."""
+        with self._lock:
+            if self._built:
+                self._set(user_id, zip_code)
+
+    # ---------- Query ----------
+    def within(self, db: Session, origin: Point, radius_km: float) -> Dict[str, float]:
+        """Owners located within `radius_km` of `origin`, as {user id: distance km}."""
+        self.ensure_built(db)
+        lat, lon = origin
+        dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        # Longitude degrees shrink with latitude; clamp near the poles
+        dlon = dlat / max(math.cos(math.radians(lat)), 0.01)
+        rows = range(self._cell(lat - dlat), self._cell(lat + dlat) + 1)
+        cols = range(self._cell(lon - dlon), self._cell(lon + dlon) + 1)
+        found: Dict[str, float] = {}
+        with self._lock:
+            if len(rows) * len(cols) > len(self._points):
+                # A circle wider than the data: checking every owner is cheaper than every cell
+                candidates: Iterable[str] = self._points
+            else:
+                candidates = (user_id for i in rows for j in cols for user_id in self._cells.get((i, j), ()))
+            for user_id in candidates:
+                distance = haversine_km(origin, self._points[user_id])
+                if distance <= radius_km:
+                    found[user_id] = distance
+        return found
+
+    def nearest(
+        self, db: Session, origin: Point, count: int, min_km: float = 0.0, max_km: Optional[float] = None,
+    ) -> Tuple[Dict[str, float], float]:
+        """
+        Owners between `min_km` and `max_km` of `origin`, as ({user id: distance km}, reach).
+        The search circle starts one grid cell past `min_km` and doubles until it holds `count`
+        such owners; every owner left out is farther than `reach` km (math.inf when none is).
+        """
+        limit = MAX_DISTANCE_KM if max_km is None else min(max_km, MAX_DISTANCE_KM)
+        radius = min_km + CELL_KM
+        while radius < limit:
+            found = {u: d for u, d in self.within(db, origin, radius).items() if d >= min_km}
+            if len(found) >= count:
+                return found, radius
+            radius *= 2
+        return {u: d for u, d in self.within(db, origin, limit).items() if d >= min_km}, math.inf
+
+    def unlocated(self):
+        """
+        select() of the ids of users with no known location (no zip_code, or one missing from
+        the centroid table), for use as a subquery. Its size follows the postcode table, not
+        the number of users.
+        """
+        return select(User.user_id).where(or_(
+            User.zip_code.is_(None), func.trim(User.zip_code).notin_(self.postcodes.spellings()),
+        ))
+
+    def distances(self, db: Session, origin: Point, owner_ids: Iterable[str]) -> Dict[str, float]:
+        """Distance from `origin` for each of `owner_ids` with a known location."""
+        self.ensure_built(db)
+        with self._lock:
+            return {
+                user_id: haversine_km(origin, self._points[user_id])
+                for user_id in set(owner_ids) if user_id in self._points
+            }
+
+    # ---------- Internals ----------
+    @staticmethod
+    def _cell(degrees: float) -> int:
+        return math.floor(degrees / CELL_DEG)
+
+    def _set(self, user_id: str, zip_code: Optional[str]) -> None:
+        old = self._points.pop(user_id, None)
+        if old is not None:
+            key = (self._cell(old[0]), self._cell(old[1]))
+            members = self._cells.get(key)
+            if members is not None:
+                members.discard(user_id)
+                if not members:
+                    del self._cells[key]
+        point = self.postcodes.centroid(zip_code)
+        if point is not None:
+            self._points[user_id] = point
+            self._cells.setdefault((self._cell(point[0]), self._cell(point[1])), set()).add(user_id)
+
+
+# Shared per-process tables
+postcodes = PostcodeTable()
+owner_geo_index = OwnerGeoIndex(postcodes)
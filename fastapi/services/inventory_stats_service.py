@@ -0,0 +1,165 @@
+"""
+Owner inventory counters (owner_inventory_stats).
+
+Every book status change and every order that opens, completes or is canceled
+records its effect on the owner's counters in an InventoryDelta; the delta is
+applied with one INSERT ... ON DUPLICATE KEY UPDATE per owner before the
+caller commits, so counters and the change that caused them commit (or roll
+back) together. Reading an owner's summary is then a primary-key lookup.
+rebuild() recomputes rows from book and orders for backfill and repair.
+"""
+
+from __future__ import annotations
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select, delete, insert, func, case, union
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+from models.book import Book, BOOK_STATUS_ENUM
+from models.order import Order
+from models.owner_inventory_stats import OwnerInventoryStats
+
+STATUS_COLUMNS = {status: f"{status}_count" for status in BOOK_STATUS_ENUM}
+# Borrow deposits are held until the order completes (refund) or is canceled
+CLOSED_ORDER_STATUSES = ("COMPLETED", "CANCELED")
+
+
+def _money(value: Any) -> Decimal:
+    return Decimal(str(value or 0))
+
+
+def owner_share(order: Order) -> Decimal:
+    """What the owner is paid for an order; mirrors build_payment_splits_for_orders."""
+    shipping = _money(order.shipping_out_fee_amount)
+    if order.action_type == "purchase":
+        return _money(order.deposit_or_sale_amount) + shipping
+    return shipping
+
+
+class InventoryDelta:
+    """Counter changes collected during one transaction, applied once per owner."""
+
+    def __init__(self) -> None:
+        self._by_owner: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, owner_id: str, column: str, amount: Any) -> None:
+        if amount:
+            cols = self._by_owner.setdefault(owner_id, {})
+            cols[column] = cols.get(column, 0) + amount
+
+    # ---------- Books ----------
+    def book_status(self, owner_id: str, old: Optional[str], new: Optional[str]) -> None:
+        """A book of `owner_id` moved from `old` to `new` (None: created / deleted)."""
+        if old == new:
+            return
+        if old in STATUS_COLUMNS:
+            self.add(owner_id, STATUS_COLUMNS[old], -1)
+        if new in STATUS_COLUMNS:
+            self.add(owner_id, STATUS_COLUMNS[new], 1)
+
+    # ---------- Orders ----------
+    def order_opened(self, order: Order) -> None:
+        self.add(order.owner_id, "total_earnings", owner_share(order))
+        if order.action_type == "borrow":
+            self.add(order.owner_id, "outstanding_deposits", _money(order.deposit_or_sale_amount))
+
+    def order_completed(self, order: Order) -> None:
+        if order.action_type == "borrow":
+            self.add(order.owner_id, "outstanding_deposits", -_money(order.deposit_or_sale_amount))
+
+    def order_canceled(self, order: Order) -> None:
+        self.add(order.owner_id, "total_earnings", -owner_share(order))
+        self.order_completed(order)
+
+    def apply(self, db: Session) -> None:
+        """Upsert the collected changes inside the caller's transaction (no commit)."""
+        table = OwnerInventoryStats.__table__
+        for owner_id, cols in self._by_owner.items():
+            cols = {k: v for k, v in cols.items() if v}
+            if not cols:
+                continue
+            stmt = mysql_insert(table).values(owner_id=owner_id, **cols)
+            stmt = stmt.on_duplicate_key_update(
+                {**{k: table.c[k] + stmt.inserted[k] for k in cols}, "updated_at": func.now()}
+            )
+            db.execute(stmt)
+        self._by_owner.clear()
+
+
+class InventoryStatsService:
+    @staticmethod
+    def get(db: Session, owner_id: str) -> Dict[str, Any]:
+        row = db.get(OwnerInventoryStats, owner_id)
+        return {
+            "ownerId": owner_id,
+            "listedCount": row.listed_count if row else 0,
+            "unlistedCount": row.unlisted_count if row else 0,
+            "lentCount": row.lent_count if row else 0,
+            "soldCount": row.sold_count if row else 0,
+            "totalEarnings": float(row.total_earnings) if row else 0.0,
+            "outstandingDeposits": float(row.outstanding_deposits) if row else 0.0,
+            "updatedAt": row.updated_at.isoformat() if row and row.updated_at else None,
+        }
+
+    @staticmethod
+    def rebuild(db: Session, owner_ids: Optional[Iterable[str]] = None) -> int:
+        """
+        Recompute rows from book and orders, for all owners or just `owner_ids`, replacing
+        what is stored. Full rebuilds race with live deltas, so run them while writes are quiet
+        (startup, maintenance). Returns the number of rows written.
+        """
+        owners = None if owner_ids is None else list(set(owner_ids))
+        if owners == []:
+            return 0
+
+        rows: Dict[str, Dict[str, Any]] = {}
+        book_stmt = select(Book.owner_id, Book.status, func.count()).group_by(Book.owner_id, Book.status)
+        order_stmt = (
+            select(
+                Order.owner_id,
+                func.sum(
+                    func.coalesce(Order.shipping_out_fee_amount, 0)
+                    + case((Order.action_type == "purchase", Order.deposit_or_sale_amount), else_=0)
+                ),
+                func.sum(case(
+                    (Order.action_type == "borrow", Order.deposit_or_sale_amount), else_=0
+                )).filter(Order.status.notin_(CLOSED_ORDER_STATUSES)),
+            )
+            .where(Order.status != "CANCELED")
+            .group_by(Order.owner_id)
+        )
+        if owners is not None:
+            book_stmt = book_stmt.where(Book.owner_id.in_(owners))
+            order_stmt = order_stmt.where(Order.owner_id.in_(owners))
+
+        for owner_id, status, count in db.execute(book_stmt).all():
+            if status in STATUS_COLUMNS:
+                rows.setdefault(owner_id, {})[STATUS_COLUMNS[status]] = count
+        for owner_id, earnings, deposits in db.execute(order_stmt).all():
+            row = rows.setdefault(owner_id, {})
+            row["total_earnings"] = _money(earnings)
+            row["outstanding_deposits"] = _money(deposits)
+
+        table = OwnerInventoryStats.__table__
+        if owners is None:
+            db.execute(delete(table))
+        else:
+            db.execute(delete(table).where(table.c.owner_id.in_(owners)))
+        zero = {**{col: 0 for col in STATUS_COLUMNS.values()}, "total_earnings": 0, "outstanding_deposits": 0}
+        records = [{"owner_id": owner_id, **zero, **cols} for owner_id, cols in rows.items()]
+        for i in range(0, len(records), 1000):
+            db.execute(insert(table), records[i:i + 1000])
+        db.commit()
+        return len(records)
+
+    @staticmethod
+    def backfill_missing(db: Session) -> int:
+        """Build rows for owners with books or orders but no stats row yet (first deploy)."""
+        have = select(OwnerInventoryStats.owner_id)
+        missing = db.execute(union(
+            select(Book.owner_id).where(Book.owner_id.notin_(have)),
+            select(Order.owner_id).where(Order.owner_id.notin_(have)),
+        )).scalars().all()
+        return InventoryStatsService.rebuild(db, missing) if missing else 0
@@ -13,6 +13,8 @@ from services.cart_service import remove_cart_items_by_book_ids
 from models.complaint import Complaint
 from sqlalchemy import or_
 from services.complaint_service import ComplaintService
+from services.book_service import BookService
+from services.inventory_stats_service import InventoryDelta
 from typing import Set
 
 class OrderService:
@@ -200,6 +202,8 @@ class OrderService:
         orders_data = OrderService.add_calculate_order_amounts(db, orders_data=orders_data_without_price)
         created_orders = []
         all_book_ids = set() # for remove items later
+        changed_books = [] # for search/filter caches after commit
+        delta = InventoryDelta() # owner dashboard counters, committed with the orders
         for order_info in orders_data:
             items = order_info["items"]
             first_item = items[0]
@@ -227,6 +231,7 @@ class OrderService:
             )
             db.add(order)
             db.flush()
+            delta.order_opened(order)
 
             # Create OrderBook entries
             for item in items:
@@ -239,6 +244,7 @@ class OrderService:
                 # Update book status based on action type
                 book = db.query(Book).filter(Book.id == item.book_id).first()
                 if book:
+                    old_status = book.status
                     # For borrow/rent: set to 'lent'
                     # For purchase: set to 'sold'
                     if order.action_type == "borrow":
@@ -247,11 +253,15 @@ class OrderService:
                         book.status = "sold"
                     else:
                         book.status = "unlisted"
+                    delta.book_status(book.owner_id, old_status, book.status)
                     all_book_ids.add(book.id)
+                    changed_books.append(book)
             created_orders.append(order)
         # checkout.status
         checkout.status = "COMPLETED"
+        delta.apply(db)
         db.commit()
+        BookService.notify_changed(changed_books)
 
         # remove items from cart
         current_user = db.query(User).filter(User.user_id == user_id).first()
@@ -367,14 +377,21 @@ class OrderService:
         order.canceled_at = datetime.now(timezone.utc)
         
         # Restore book availability - set books back to 'listed' status
+        changed_books = []
+        delta = InventoryDelta()
+        delta.order_canceled(order)
         for order_book in order.books:
             if order_book.book:
                 book = db.query(Book).filter(Book.id == order_book.book_id).first()
                 # Restore to listed if it was unlisted, lent, or sold due to this order
                 if book.status in ["unlisted", "lent", "sold"]:
+                    delta.book_status(book.owner_id, book.status, "listed")
                     book.status = "listed"
+                    changed_books.append(book)
         
+        delta.apply(db)
         db.commit()
+        BookService.notify_changed(changed_books)
         return True
 
     @staticmethod
@@ -638,6 +655,8 @@ class OrderService:
         ).all()
         
         count = 0
+        changed_books = []
+        delta = InventoryDelta()
         for order in orders:
             # Calculate expected delivery date: returned_at + estimated_delivery_time
             delivery_time = order.estimated_delivery_time or 7
@@ -646,6 +665,7 @@ class OrderService:
             if now >= expected_delivery:
                 order.status = "COMPLETED"
                 order.completed_at = now
+                delta.order_completed(order)
 
                 # Restore book availability for borrowed books
                 # For borrow orders: set books back to 'listed'
@@ -656,10 +676,14 @@ class OrderService:
                             book = db.query(Book).filter(Book.id == order_book.book_id).first()
                             if book and book.status == "lent":
                                 book.status = "listed"
+                                delta.book_status(book.owner_id, "lent", "listed")
+                                changed_books.append(book)
 
                 count += 1
 
+        delta.apply(db)
         db.commit()
+        BookService.notify_changed(changed_books)
         return count
     
     @staticmethod
@@ -684,15 +708,22 @@ class OrderService:
         # Restore book availability for borrowed books
         # For borrow orders: set books back to 'listed'
         # For purchase orders: books stay as 'sold'
+        changed_books = []
+        delta = InventoryDelta()
+        delta.order_completed(order)
         if order.action_type == "borrow":
             for order_book in order.books:
                 if order_book.book:
                     book = db.query(Book).filter(Book.id == order_book.book_id).first()
                     if book and book.status == "lent":
                         book.status = "listed"
+                        delta.book_status(book.owner_id, "lent", "listed")
+                        changed_books.append(book)
 
+        delta.apply(db)
         db.commit()
         db.refresh(order)
+        BookService.notify_changed(changed_books)
 
         # Trigger refund
         if order.payment_id:
@@ -17,6 +17,7 @@ from models.order import Order
 from models.payment_split import PaymentSplit
 from models.checkout import CheckoutItem
 from services.order_service import OrderService
+from core.principal_cache import principal_cache
 
 logger = logging.getLogger(__name__)
 
@@ -118,6 +119,7 @@ def create_express_account(email: str, *, db: Session):
         user.stripe_account_id = account.id
         db.commit()
         db.refresh(user)
+        principal_cache.invalidate(user.email)
 
         return {
             "account_id": account.id,
@@ -0,0 +1,261 @@
+"""
+Saved searches and new-listing alerts.
+
+Saved searches are compiled once into in-memory predicates and indexed by a
+single anchor each: their longest keyword term, else their category, else
+their language. When a book becomes listed, only the searches anchored on one
+of its word prefixes, its category or its language (plus the few with no
+anchor) are checked, so matching cost does not grow with the number of
+saved searches. Matches are written to saved_search_matches on a background
+worker, off the request that listed the book.
+"""
+
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import shlex
+import threading
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, update, func
+
+from database.connection import SessionLocal
+from models.book import Book
+from models.saved_search import SavedSearch, SavedSearchMatch
+from services.search_index import SEARCH_FIELDS, tokenize, isbn_digits, query_terms, normalize
+from utils.validators import to_isbn13
+
+# Per-user limit on saved searches
+MAX_SAVED_SEARCHES = 20
+
+Anchor = Tuple[str, str]  # ("term" | "category" | "lang" | "any", value)
+
+
+class CompiledSearch:
+    """A saved search reduced to what a single-book predicate needs."""
+    __slots__ = ("id", "user_id", "terms", "category", "lang", "can_rent", "can_sell",
+                 "delivery", "min_price", "max_price")
+
+    def __init__(self, s: SavedSearch) -> None:
+        self.id = s.id
+        self.user_id = s.user_id
+        self.terms = sorted({t for tok in shlex.split(s.q or "") for t in query_terms(tok)})
+        self.category = normalize(s.category) if s.category else None
+        self.lang = normalize(s.lang) if s.lang else None
+        self.can_rent = s.can_rent
+        self.can_sell = s.can_sell
+        self.delivery = s.delivery if s.delivery and s.delivery != "any" else None
+        self.min_price = Decimal(str(s.min_price)) if s.min_price is not None else None
+        self.max_price = Decimal(str(s.max_price)) if s.max_price is not None else None
+
+    def anchor(self) -> Anchor:
+        if self.terms:
+            return "term", max(self.terms, key=len)
+        if self.category:
+            return "category", self.category
+        if self.lang:
+            return "lang", self.lang
+        return "any", ""
+
+    def matches(self, book: Dict[str, Any]) -> bool:
+        """Same semantics as /books/search for a single listed book."""
+        if self.category and self.category != book["category"]:
+            return False
+        if self.lang and self.lang != book["lang"]:
+            return False
+        if self.can_rent is not None and self.can_rent != book["can_rent"]:
+            return False
+        if self.can_sell is not None and self.can_sell != book["can_sell"]:
+            return False
+        if self.delivery and book["delivery_method"] not in (self.delivery, "both"):
+            return False
+        if self.min_price is not None and book["price"] < self.min_price:
+            return False
+        if self.max_price is not None and book["price"] > self.max_price:
+            return False
+        words = book["words"]
+        return all(any(w.startswith(term) for w in words) for term in self.terms)
+
+
+class SavedSearchIndex:
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._searches: Dict[str, CompiledSearch] = {}
+        self._by_anchor: Dict[Anchor, Set[str]] = {}
+        self._built = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="saved-search-alerts")
+
+    # ---------- Build ----------
+    def ensure_built(self, db: Session) -> None:
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+            for s in db.execute(select(SavedSearch)).scalars():
+                self._add(CompiledSearch(s))
+            self._built = True
+
+    # ---------- Maintenance ----------
+    def add(self, s: SavedSearch) -> None:
+        with self._lock:
+            if self._built:
+                self._add(CompiledSearch(s))
+
+    def remove(self, search_id: str) -> None:
+        with self._lock:
+            compiled = self._searches.pop(search_id, None)
+            if compiled is not None:
+                ids = self._by_anchor.get(compiled.anchor())
+                if ids is not None:
+                    ids.discard(search_id)
+                    if not ids:
+                        del self._by_anchor[compiled.anchor()]
+
+    # ---------- Matching ----------
+    def on_listed(self, books: Iterable[Book]) -> None:
+        """Queue newly listed books for matching; returns immediately."""
+        snapshots = [self._snapshot(b) for b in books]
+        if snapshots:
+            self._executor.submit(self._record_matches, snapshots)
+
+    def match(self, db: Session, book: Dict[str, Any]) -> List[CompiledSearch]:
+        """Saved searches matching one book snapshot, looked up through the anchor index."""
+        self.ensure_built(db)
+        keys: Set[Anchor] = {("any", "")}
+        if book["category"]:
+            keys.add(("category", book["category"]))
+        if book["lang"]:
+            keys.add(("lang", book["lang"]))
+        for word in book["words"]:
+            for i in range(1, len(word) + 1):
+                keys.add(("term", word[:i]))
+        with self._lock:
+            candidates = {sid for key in keys for sid in self._by_anchor.get(key, ())}
+            return [self._searches[sid] for sid in candidates if self._searches[sid].matches(book)]
+
+    # ---------- Internals ----------
+    def _add(self, compiled: CompiledSearch) -> None:
+        self.remove(compiled.id)
+        self._searches[compiled.id] = compiled
+        self._by_anchor.setdefault(compiled.anchor(), set()).add(compiled.id)
+
+    @staticmethod
+    def _snapshot(book: Book) -> Dict[str, Any]:
+        """Plain copy of what matching needs, safe to hand to another thread."""
+        words: Set[str] = set()
+        for field in SEARCH_FIELDS:
+            words.update(tokenize(getattr(book, field, None)))
+        raw_isbn = getattr(book, "isbn", None)
+        words.update(f for f in (isbn_digits(raw_isbn).lower(), to_isbn13(raw_isbn)) if f)
+        price = book.sale_price if book.sale_price is not None else book.deposit
+        return {
+            "id": book.id,
+            "owner_id": book.owner_id,
+            "words": words,
+            "category": normalize(book.category) if book.category else None,
+            "lang": normalize(book.original_language) if book.original_language else None,
+            "can_rent": book.can_rent,
+            "can_sell": book.can_sell,
+            "delivery_method": book.delivery_method,
+            "price": Decimal(str(price)) if price is not None else Decimal("0"),
+        }
+
+    def _record_matches(self, snapshots: List[Dict[str, Any]]) -> None:
+        db = SessionLocal()
+        try:
+            pairs = {
+                (s.id, book["id"]): s.user_id
+                for book in snapshots
+                for s in self.match(db, book)
+                if s.user_id != book["owner_id"]  # no alerts for your own listings
+            }
+            if not pairs:
+                return
+            # One alert per (search, book), even if the book is later relisted
+            existing = set(db.execute(
+                select(SavedSearchMatch.saved_search_id, SavedSearchMatch.book_id)
+                .where(SavedSearchMatch.book_id.in_({book_id for _, book_id in pairs}))
+            ).all())
+            rows = [
+                {"saved_search_id": sid, "book_id": book_id, "user_id": user_id, "seen": False}
+                for (sid, book_id), user_id in pairs.items() if (sid, book_id) not in existing
+            ]
+            if rows:
+                db.execute(insert(SavedSearchMatch), rows)
+                db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Saved search matching failed: {e}")
+        finally:
+            db.close()
+
+
+# Shared per-process index
+saved_search_index = SavedSearchIndex()
+
+
+class SavedSearchService:
+    @staticmethod
+    def create(db: Session, user_id: str, payload: Dict[str, Any]) -> SavedSearch:
+        criteria = {k: v for k, v in payload.items() if k != "name" and v not in (None, "", "any")}
+        if not criteria:
+            raise HTTPException(status_code=400, detail="A saved search needs at least one filter")
+        if payload.get("q"):
+            try:
+                shlex.split(payload["q"])
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid search keywords")
+        count = db.execute(
+            select(func.count()).select_from(SavedSearch).where(SavedSearch.user_id == user_id)
+        ).scalar()
+        if count >= MAX_SAVED_SEARCHES:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_SAVED_SEARCHES} saved searches")
+
+        saved = SavedSearch(user_id=user_id, **payload)
+        db.add(saved)
+        db.commit()
+        db.refresh(saved)
+        saved_search_index.add(saved)
+        return saved
+
+    @staticmethod
+    def list(db: Session, user_id: str) -> List[SavedSearch]:
+        return db.execute(
+            select(SavedSearch).where(SavedSearch.user_id == user_id).order_by(SavedSearch.created_at.desc())
+        ).scalars().all()
+
+    @staticmethod
+    def delete(db: Session, user_id: str, search_id: str) -> None:
+        saved = db.get(SavedSearch, search_id)
+        if not saved or saved.user_id != user_id:
+            raise HTTPException(status_code=404, detail="Saved search not found")
+        db.delete(saved)
+        db.commit()
+        saved_search_index.remove(search_id)
+
+    @staticmethod
+    def alerts(db: Session, user_id: str, unseen_only: bool = True, limit: int = 50) -> List[Tuple[SavedSearchMatch, Book]]:
+        """Newest matches first, with their (still listed) books."""
+        stmt = (
+            select(SavedSearchMatch, Book)
+            .join(Book, Book.id == SavedSearchMatch.book_id)
+            .where(SavedSearchMatch.user_id == user_id, Book.status == "listed")
+            .order_by(SavedSearchMatch.matched_at.desc())
+            .limit(limit)
+        )
+        if unseen_only:
+            stmt = stmt.where(SavedSearchMatch.seen.is_(False))
+        return db.execute(stmt).all()
+
+    @staticmethod
+    def mark_seen(db: Session, user_id: str) -> int:
+        result = db.execute(
+            update(SavedSearchMatch)
+            .where(SavedSearchMatch.user_id == user_id, SavedSearchMatch.seen.is_(False))
+            .values(seen=True)
+        )
+        db.commit()
+        return result.rowcount
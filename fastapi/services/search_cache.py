@@ -0,0 +1,57 @@
+"""
+Result cache for anonymous /books/search calls.
+
+Whole search results are cached for a short TTL keyed on the normalized query
+parameters. Concurrent misses for the same key are coalesced so that only one
+of them runs the queries. Every BookService write clears the cache; a
+generation counter stops a search that started before the write from storing
+its (now stale) result afterwards.
+"""
+
+from typing import Any, Callable, Dict, Hashable
+import threading
+
+from utils.cache import TTLCache, SingleFlight
+
+_MISSING = object()
+
+
+class SearchResultCache:
+    def __init__(self, maxsize: int = 512, ttl: float = 30.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    @staticmethod
+    def key(**params: Any) -> Hashable:
+        """Order-independent key; whitespace in `q` is collapsed."""
+        if params.get("q"):
+            params["q"] = " ".join(params["q"].split())
+        return tuple(sorted(params.items()))
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        value = self._cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        return self._flight.do(key, lambda: self._load(key, compute))
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._cache.stats(), "coalesced": self._flight.shared}
+
+    def _load(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        generation = self._generation
+        value = compute()
+        with self._lock:
+            if generation == self._generation:
+                self._cache.set(key, value)
+        return value
+
+
+# Shared per-process cache
+search_cache = SearchResultCache()
@@ -0,0 +1,272 @@
+"""
+In-process inverted index over the searchable book fields.
+
+BookService keeps it up to date on create/update/delete, and search_books
+asks it for candidate ids instead of running LIKE scans over the book table.
+Query tokens match indexed terms by prefix, found with bisect over a sorted
+vocabulary, so a lookup costs O(log V + matching postings).
+
+Postings carry per-field term frequencies so the same structure can rank
+results with BM25 (title > author > description, exact ISBN hits first).
+"""
+
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import bisect
+import heapq
+import math
+import re
+import threading
+import unicodedata
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+
+from models.book import Book
+from utils.validators import to_isbn13
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Fields indexed for keyword search (same set the old LIKE query covered)
+SEARCH_FIELDS = ("title_or", "title_en", "author", "description", "isbn")
+
+# Scored field groups: both titles count as "title"; ISBN is scored separately
+FIELD_GROUPS = (("title_or", "title_en"), ("author",), ("description",))
+FIELD_WEIGHTS = (3.0, 2.0, 1.0)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# A query term that only prefixes a word ("hob" -> "hobbit") scores lower than an exact word
+PREFIX_MATCH_FACTOR = 0.7
+# A typo-corrected word (see services/trigram_index.py) scores this much times its similarity
+FUZZY_MATCH_FACTOR = 0.5
+# Exact ISBN hits always rank above text matches
+ISBN_EXACT_BOOST = 1000.0
+
+
+def normalize(text: str) -> str:
+    """Lower-case and strip accents so that 'García' and 'garcia' index the same."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return _WORD_RE.findall(normalize(text))
+
+
+def isbn_digits(value: Optional[str]) -> str:
+    """Strip separators from an ISBN-like string ('978-0-14 044913-6' -> '9780140449136')."""
+    if not value:
+        return ""
+    return re.sub(r"[\s-]", "", value).upper()
+
+
+def query_terms(token: str) -> List[str]:
+    """Terms a single shlex query token must match (all of them, by prefix)."""
+    digits = isbn_digits(token)
+    if digits and (digits.isdigit() or (digits[:-1].isdigit() and digits[-1] == "X")):
+        return [digits.lower()]
+    return tokenize(token)
+
+
+# Term frequency per field group: (title, author, description)
+TermFreqs = Tuple[int, int, int]
+
+# Query term -> [(indexed word, similarity)] to search instead when the term matches nothing
+Fuzzy = Dict[str, List[Tuple[str, float]]]
+
+
+class BookSearchIndex:
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, TermFreqs]] = {}  # term -> {book id: tfs}
+        self._doc_terms: Dict[str, Set[str]] = {}             # book id -> terms (for removal)
+        self._doc_lens: Dict[str, Tuple[int, int, int]] = {}  # book id -> field group lengths
+        self._doc_isbn: Dict[str, Set[str]] = {}              # book id -> normalized ISBN forms
+        self._len_sums = [0, 0, 0]
+        self._vocab: List[str] = []                           # sorted terms, for prefix lookups
+        self._built = False
+
+    # ---------- Build ----------
+    def ensure_built(self, db: Session) -> None:
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+            rows = db.execute(
+                select(Book.id, *[getattr(Book, f) for f in SEARCH_FIELDS])
+            ).all()
+            for row in rows:
+                self._add(row, keep_sorted=False)
+            self._vocab = sorted(self._postings)
+            self._built = True
+
+    # ---------- Maintenance ----------
+    def upsert(self, book: Book) -> None:
+        with self._lock:
+            if not self._built:
+                # Not loaded yet; the first search builds from the table anyway
+                return
+            self._remove(book.id)
+            self._add(book)
+
+    def remove(self, book_id: str) -> None:
+        with self._lock:
+            if self._built:
+                self._remove(book_id)
+
+    # ---------- Query ----------
+    def has_prefix(self, db: Session, term: str) -> bool:
+        """True if some indexed word starts with `term`."""
+        self.ensure_built(db)
+        with self._lock:
+            i = bisect.bisect_left(self._vocab, term)
+            return i < len(self._vocab) and self._vocab[i].startswith(term)
+
+    def candidates(self, db: Session, tokens: Iterable[str], fuzzy: Optional[Fuzzy] = None) -> Set[str]:
+        """
+        Ids of books matching every token (AND across tokens, prefix match per term).
+        A term with no prefix match falls back to its `fuzzy` alternatives (OR).
+        """
+        self.ensure_built(db)
+        result: Optional[Set[str]] = None
+        with self._lock:
+            for tok in tokens:
+                for term in query_terms(tok):
+                    ids = self._prefix_postings(term)
+                    if not ids and fuzzy:
+                        for word, _ in fuzzy.get(term, ()):
+                            ids.update(self._postings.get(word, ()))
+                    result = ids if result is None else result & ids
+                    if not result:
+                        return set()
+        return result if result is not None else set()
+
+    def top_k(
+        self, db: Session, tokens: Iterable[str], ids: Iterable[str], k: int,
+        after: Optional[Tuple[float, str]] = None, fuzzy: Optional[Fuzzy] = None,
+    ) -> List[Tuple[float, str]]:
+        """
+        Rank `ids` by BM25 against the query tokens and return the best k as (score, id), best first.
+        `after` is the (score, id) of the last row already served, for keyset paging.
+        Uses a bounded heap, so the cost is O(n log k) rather than a full sort.
+        """
+        self.ensure_built(db)
+        terms = [term for tok in tokens for term in query_terms(tok)]
+        with self._lock:
+            scores = self._scores(terms, set(ids), fuzzy or {})
+        ranked = ((score, book_id) for book_id, score in scores.items())
+        if after is not None:
+            ranked = (pair for pair in ranked if pair < after)
+        return heapq.nlargest(k, ranked)
+
+    # ---------- Internals ----------
+    def _scores(self, terms: List[str], ids: Set[str], fuzzy: Fuzzy) -> Dict[str, float]:
+        n_docs = max(len(self._doc_lens), 1)
+        avg_lens = [max(total / n_docs, 1.0) for total in self._len_sums]
+        scores: Dict[str, float] = {book_id: 0.0 for book_id in ids}
+
+        for term in terms:
+            # Best contribution of this query term per doc, over all words it prefixes
+            best: Dict[str, float] = {}
+            matches = [
+                (word, 1.0 if word == term else PREFIX_MATCH_FACTOR) for word in self._prefix_terms(term)
+            ] or [
+                (word, FUZZY_MATCH_FACTOR * similarity) for word, similarity in fuzzy.get(term, ())
+                if word in self._postings
+            ]
+            for word, factor in matches:
+                postings = self._postings[word]
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for book_id, tfs in postings.items():
+                    if book_id not in scores:
+                        continue
+                    contribution = factor * idf * self._weighted_tf(tfs, self._doc_lens[book_id], avg_lens)
+                    if word == term and word in self._doc_isbn.get(book_id, ()):
+                        contribution += ISBN_EXACT_BOOST
+                    if contribution > best.get(book_id, 0.0):
+                        best[book_id] = contribution
+            for book_id, contribution in best.items():
+                scores[book_id] += contribution
+        return scores
+
+    @staticmethod
+    def _weighted_tf(tfs: TermFreqs, lens: Tuple[int, int, int], avg_lens: List[float]) -> float:
+        # BM25F: length-normalise and weight each field, then saturate once
+        tf = 0.0
+        for weight, freq, length, avg in zip(FIELD_WEIGHTS, tfs, lens, avg_lens):
+            if freq:
+                tf += weight * freq / (1 - B + B * length / avg)
+        return tf * (K1 + 1) / (K1 + tf) if tf else 0.0
+
+    @staticmethod
+    def _analyze(book) -> Tuple[Dict[str, List[int]], Tuple[int, int, int], Set[str]]:
+        freqs: Dict[str, List[int]] = {}
+        lens = [0, 0, 0]
+        for group_idx, group in enumerate(FIELD_GROUPS):
+            for field in group:
+                words = tokenize(getattr(book, field, None))
+                lens[group_idx] += len(words)
+                for word in words:
+                    freqs.setdefault(word, [0, 0, 0])[group_idx] += 1
+        raw_isbn = getattr(book, "isbn", None)
+        # Both the stored digits and the canonical ISBN-13, so either form of the number finds it
+        isbns = {form for form in (isbn_digits(raw_isbn).lower(), to_isbn13(raw_isbn)) if form}
+        for form in isbns:
+            freqs.setdefault(form, [0, 0, 0])
+        return freqs, (lens[0], lens[1], lens[2]), isbns
+
+    def _add(self, book, keep_sorted: bool = True) -> None:
+        freqs, lens, isbns = self._analyze(book)
+        book_id = book.id
+        self._doc_terms[book_id] = set(freqs)
+        self._doc_lens[book_id] = lens
+        for i, length in enumerate(lens):
+            self._len_sums[i] += length
+        if isbns:
+            self._doc_isbn[book_id] = isbns
+        for term, tfs in freqs.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                if keep_sorted:
+                    bisect.insort(self._vocab, term)
+            postings[book_id] = (tfs[0], tfs[1], tfs[2])
+
+    def _remove(self, book_id: str) -> None:
+        lens = self._doc_lens.pop(book_id, None)
+        if lens is not None:
+            for i, length in enumerate(lens):
+                self._len_sums[i] -= length
+        self._doc_isbn.pop(book_id, None)
+        for term in self._doc_terms.pop(book_id, ()):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(book_id, None)
+            if not postings:
+                del self._postings[term]
+                i = bisect.bisect_left(self._vocab, term)
+                if i < len(self._vocab) and self._vocab[i] == term:
+                    del self._vocab[i]
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        i = bisect.bisect_left(self._vocab, prefix)
+        j = i
+        while j < len(self._vocab) and self._vocab[j].startswith(prefix):
+            j += 1
+        return self._vocab[i:j]
+
+    def _prefix_postings(self, prefix: str) -> Set[str]:
+        ids: Set[str] = set()
+        for term in self._prefix_terms(prefix):
+            ids.update(self._postings[term])
+        return ids
+
+
+# Shared per-process index
+search_index = BookSearchIndex()
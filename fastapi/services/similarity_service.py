@@ -0,0 +1,186 @@
+"""
+Batch job computing "similar books" (book_similarity table).
+
+Each book is a TF-IDF vector over its title words, author, category and tags;
+neighbours are ranked by cosine similarity blended with how often two books
+were ordered together (order_books). Similarities are computed block by block
+with NumPy: a block of rows is multiplied against the whole corpus through
+the term -> books postings, so memory stays at block_size x n_books floats.
+"""
+
+from __future__ import annotations
+from typing import Dict, List, Tuple
+import math
+
+import numpy as np
+from sqlalchemy.orm import Session
+from sqlalchemy import select, delete, insert
+
+from models.book import Book
+from models.order import OrderBook
+from models.book_similarity import BookSimilarity
+from services.search_index import normalize, tokenize
+
+# Neighbours stored per book
+TOP_N = 20
+# Blend of content similarity and order co-occurrence
+CONTENT_WEIGHT = 0.7
+COOCCURRENCE_WEIGHT = 0.3
+# Feature weights: same author or category counts more than a shared title word
+AUTHOR_WEIGHT = 2.0
+CATEGORY_WEIGHT = 1.0
+TAG_WEIGHT = 1.0
+TITLE_WEIGHT = 1.0
+# Terms in more than this share of books say nothing about similarity
+MAX_DF_RATIO = 0.5
+# Score matrix cells per block (float64): ~32 MB
+BLOCK_CELLS = 4_000_000
+
+
+class SimilarityService:
+    @staticmethod
+    def recompute(db: Session, top_n: int = TOP_N) -> int:
+        """Rebuild book_similarity from scratch; returns the number of rows written."""
+        rows = db.execute(
+            select(Book.id, Book.title_or, Book.title_en, Book.author, Book.category, Book.tags)
+            .order_by(Book.id)
+        ).all()
+        ids = [r.id for r in rows]
+        n = len(ids)
+
+        records: List[dict] = []
+        if n > 1:
+            features = [SimilarityService._features(r) for r in rows]
+            indptr, indices, data = SimilarityService._tfidf(features, n)
+            col_ptr, col_rows, col_vals = SimilarityService._transpose(indptr, indices, data, n)
+            co = SimilarityService._cooccurrence(db, {book_id: i for i, book_id in enumerate(ids)})
+
+            k = min(top_n, n - 1)
+            block = max(1, BLOCK_CELLS // n)
+            for start in range(0, n, block):
+                stop = min(start + block, n)
+                scores = CONTENT_WEIGHT * SimilarityService._block_scores(
+                    indptr, indices, data, col_ptr, col_rows, col_vals, start, stop, n
+                )
+                for i in range(start, stop):
+                    for j, value in co.get(i, ()):
+                        scores[i - start, j] += COOCCURRENCE_WEIGHT * value
+                local = np.arange(stop - start)
+                scores[local, local + start] = -np.inf  # a book is not its own neighbour
+
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                top_scores = np.take_along_axis(scores, top, axis=1)
+                order = np.argsort(-top_scores, axis=1, kind="stable")
+                top = np.take_along_axis(top, order, axis=1)
+                top_scores = np.take_along_axis(top_scores, order, axis=1)
+                for r in range(stop - start):
+                    rank = 0
+                    for j, score in zip(top[r], top_scores[r]):
+                        if score <= 0:
+                            break
+                        records.append({
+                            "book_id": ids[start + r], "rank": rank,
+                            "similar_book_id": ids[j], "score": float(score),
+                        })
+                        rank += 1
+
+        # Swap the whole table in one transaction so readers never see a half-written set
+        db.execute(delete(BookSimilarity))
+        for i in range(0, len(records), 1000):
+            db.execute(insert(BookSimilarity), records[i:i + 1000])
+        db.commit()
+        return len(records)
+
+    # ---------- Internals ----------
+    @staticmethod
+    def _features(row) -> Dict[str, float]:
+        """Weighted term counts of one book."""
+        feats: Dict[str, float] = {}
+        for field in (row.title_or, row.title_en):
+            for word in tokenize(field):
+                feats["w:" + word] = TITLE_WEIGHT
+        if row.author:
+            feats["a:" + " ".join(tokenize(row.author))] = AUTHOR_WEIGHT
+        if row.category:
+            feats["c:" + normalize(row.category.strip())] = CATEGORY_WEIGHT
+        for tag in row.tags or []:
+            if isinstance(tag, str) and tag.strip():
+                feats["t:" + normalize(tag.strip())] = TAG_WEIGHT
+        return feats
+
+    @staticmethod
+    def _tfidf(features: List[Dict[str, float]], n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """L2-normalised TF-IDF rows in CSR form (indptr, indices, data)."""
+        df: Dict[str, int] = {}
+        for feats in features:
+            for term in feats:
+                df[term] = df.get(term, 0) + 1
+        max_df = max(2, int(MAX_DF_RATIO * n))
+        # Terms of a single book cannot link two books
+        vocab = {term: i for i, term in enumerate(t for t, c in df.items() if 1 < c <= max_df)}
+
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        for feats in features:
+            row = [(vocab[t], w * (math.log((1 + n) / (1 + df[t])) + 1)) for t, w in feats.items() if t in vocab]
+            norm = math.sqrt(sum(v * v for _, v in row)) or 1.0
+            for col, value in row:
+                indices.append(col)
+                data.append(value / norm)
+            indptr.append(len(indices))
+        return np.asarray(indptr, dtype=np.int64), np.asarray(indices, dtype=np.int64), np.asarray(data)
+
+    @staticmethod
+    def _transpose(indptr, indices, data, n) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Term -> books postings (CSC of the TF-IDF matrix)."""
+        n_terms = int(indices.max()) + 1 if indices.size else 0
+        rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(indptr))
+        order = np.argsort(indices, kind="stable")
+        col_ptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(indices, minlength=n_terms), out=col_ptr[1:])
+        return col_ptr, rows[order], data[order]
+
+    @staticmethod
+    def _block_scores(indptr, indices, data, col_ptr, col_rows, col_vals, start, stop, n) -> np.ndarray:
+        """Dense cosine similarities of rows [start, stop) against all n books."""
+        lo, hi = indptr[start], indptr[stop]
+        if lo == hi:
+            return np.zeros((stop - start, n))
+        local_rows = np.repeat(np.arange(stop - start), np.diff(indptr[start:stop + 1]))
+        terms, weights = indices[lo:hi], data[lo:hi]
+        # Expand every (row, term) entry into the term's postings
+        counts = col_ptr[terms + 1] - col_ptr[terms]
+        total = int(counts.sum())
+        firsts = np.cumsum(counts) - counts
+        positions = np.repeat(col_ptr[terms] - firsts, counts) + np.arange(total)
+        flat = np.repeat(local_rows, counts) * n + col_rows[positions]
+        values = np.repeat(weights, counts) * col_vals[positions]
+        return np.bincount(flat, weights=values, minlength=(stop - start) * n).reshape(stop - start, n)
+
+    @staticmethod
+    def _cooccurrence(db: Session, index: Dict[str, int]) -> Dict[int, List[Tuple[int, float]]]:
+        """
+        Per book row, [(other row, value)] with value the cosine over order membership:
+        orders containing both / sqrt(orders_a * orders_b).
+        """
+        orders: Dict[str, List[int]] = {}
+        for order_id, book_id in db.execute(select(OrderBook.order_id, OrderBook.book_id)).all():
+            if book_id in index:
+                orders.setdefault(order_id, []).append(index[book_id])
+        popularity: Dict[int, int] = {}
+        pairs: Dict[Tuple[int, int], int] = {}
+        for books in orders.values():
+            books = sorted(set(books))
+            for b in books:
+                popularity[b] = popularity.get(b, 0) + 1
+            for x in range(len(books)):
+                for y in range(x + 1, len(books)):
+                    pair = (books[x], books[y])
+                    pairs[pair] = pairs.get(pair, 0) + 1
+        co: Dict[int, List[Tuple[int, float]]] = {}
+        for (a, b), count in pairs.items():
+            value = count / math.sqrt(popularity[a] * popularity[b])
+            co.setdefault(a, []).append((b, value))
+            co.setdefault(b, []).append((a, value))
+        return co
@@ -0,0 +1,146 @@
+"""
+In-process typeahead index for /books/suggest.
+
+Holds the titles, authors and categories of listed books as normalized keys in
+one sorted array, so a prefix lookup is a bisect plus a short scan and never
+touches the database. A phrase is keyed from each of its first few words, so
+"hob" suggests "The Hobbit" as well as titles that start with "Hob".
+BookService keeps it current on every write.
+"""
+
+from __future__ import annotations
+from typing import Dict, List, Optional, Set, Tuple
+import bisect
+import heapq
+import threading
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+
+from models.book import Book
+from services.search_index import tokenize
+
+# Suggestion type -> Book fields it comes from
+SUGGEST_FIELDS = (("title", ("title_or", "title_en")), ("author", ("author",)), ("category", ("category",)))
+# A phrase is reachable from the start of each of its first N words
+MAX_WORD_STARTS = 4
+# Upper bound on keys examined per lookup, so one-letter prefixes stay cheap
+SCAN_LIMIT = 2000
+
+PhraseKey = Tuple[str, str]  # (type, normalized phrase)
+
+
+class SuggestIndex:
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._keys: List[Tuple[str, str, str]] = []           # sorted (key, type, phrase)
+        self._phrases: Dict[PhraseKey, List] = {}             # -> [display text, listed books]
+        self._doc_phrases: Dict[str, Set[PhraseKey]] = {}     # book id -> phrases (for removal)
+        self._built = False
+
+    # ---------- Build ----------
+    def ensure_built(self, db: Session) -> None:
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+            fields = {f for _, group in SUGGEST_FIELDS for f in group}
+            rows = db.execute(
+                select(Book.id, *[getattr(Book, f) for f in sorted(fields)])
+                .where(Book.status == "listed")
+            ).all()
+            for row in rows:
+                self._add(row, keep_sorted=False)
+            self._keys.sort()
+            self._built = True
+
+    # ---------- Maintenance ----------
+    def upsert(self, book: Book) -> None:
+        with self._lock:
+            if not self._built:
+                return
+            self._remove(book.id)
+            if book.status == "listed":
+                self._add(book)
+
+    def remove(self, book_id: str) -> None:
+        with self._lock:
+            if self._built:
+                self._remove(book_id)
+
+    # ---------- Query ----------
+    def suggest(self, db: Session, prefix: str, limit: int = 10, kind: Optional[str] = None) -> List[dict]:
+        """Up to `limit` phrases with a word starting with `prefix`, most listed books first."""
+        needle = " ".join(tokenize(prefix))
+        if prefix[-1:].isspace() and needle:
+            needle += " "
+        if not needle:
+            return []
+        self.ensure_built(db)
+        with self._lock:
+            best: Dict[PhraseKey, int] = {}
+            i = bisect.bisect_left(self._keys, (needle,))
+            for key, typ, phrase in self._keys[i:i + SCAN_LIMIT]:
+                if not key.startswith(needle):
+                    break
+                if kind is None or typ == kind:
+                    best[(typ, phrase)] = self._phrases[(typ, phrase)][1]
+            top = heapq.nsmallest(limit, best.items(), key=lambda item: (-item[1], item[0][1]))
+            return [
+                {"text": self._phrases[pk][0], "type": pk[0], "count": count}
+                for pk, count in top
+            ]
+
+    # ---------- Internals ----------
+    @staticmethod
+    def _phrases_of(book) -> Dict[PhraseKey, str]:
+        found: Dict[PhraseKey, str] = {}
+        for typ, fields in SUGGEST_FIELDS:
+            for field in fields:
+                text = (getattr(book, field, None) or "").strip()
+                words = tokenize(text)
+                if words:
+                    found.setdefault((typ, " ".join(words)), text)
+        return found
+
+    def _add(self, book, keep_sorted: bool = True) -> None:
+        phrases = self._phrases_of(book)
+        self._doc_phrases[book.id] = set(phrases)
+        for pk, text in phrases.items():
+            entry = self._phrases.get(pk)
+            if entry is not None:
+                entry[1] += 1
+                continue
+            self._phrases[pk] = [text, 1]
+            for key in self._keys_of(pk):
+                if keep_sorted:
+                    bisect.insort(self._keys, key)
+                else:
+                    self._keys.append(key)
+
+    def _remove(self, book_id: str) -> None:
+        for pk in self._doc_phrases.pop(book_id, ()):
+            entry = self._phrases.get(pk)
+            if entry is None:
+                continue
+            entry[1] -= 1
+            if entry[1] > 0:
+                continue
+            del self._phrases[pk]
+            for key in self._keys_of(pk):
+                i = bisect.bisect_left(self._keys, key)
+                if i < len(self._keys) and self._keys[i] == key:
+                    del self._keys[i]
+
+    @staticmethod
+    def _keys_of(pk: PhraseKey) -> List[Tuple[str, str, str]]:
+        typ, phrase = pk
+        words = phrase.split(" ")
+        return list(dict.fromkeys(
+            (" ".join(words[i:]), typ, phrase) for i in range(min(len(words), MAX_WORD_STARTS))
+        ))
+
+
+# Shared per-process index
+suggest_index = SuggestIndex()
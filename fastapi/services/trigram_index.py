@@ -0,0 +1,142 @@
+"""
+In-process trigram index over the words of book titles and authors.
+
+The inverted index (services/search_index.py) only matches query terms by prefix,
+so one misspelt letter ("tolkein", "dostoyevsky" vs "dostoevsky") finds nothing.
+This index maps each trigram to the title/author words containing it, so the
+words most similar to an unmatched term can be found in one lookup and searched
+in its place. Similarity is pg_trgm's: shared trigrams / trigrams in either word.
+"""
+
+from __future__ import annotations
+from typing import Dict, List, Set, Tuple
+import threading
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+
+from models.book import Book
+from services.search_index import tokenize
+
+# Fields whose words are candidates for typo correction
+FUZZY_FIELDS = ("title_or", "title_en", "author")
+
+# Same default as pg_trgm's similarity_threshold
+SIMILARITY_THRESHOLD = 0.3
+# Words a single misspelt term may expand to
+MAX_EXPANSIONS = 8
+# Shorter terms have too few trigrams to correct reliably
+MIN_TERM_LENGTH = 3
+# Memoised lookups, dropped on every write
+_MEMO_SIZE = 1024
+
+
+def trigrams(word: str) -> Set[str]:
+    """Trigrams of a word padded like pg_trgm ('  word ')."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._grams: Dict[str, Set[str]] = {}      # trigram -> words
+        self._word_sizes: Dict[str, int] = {}      # word -> number of trigrams
+        self._word_refs: Dict[str, int] = {}       # word -> number of books using it
+        self._doc_words: Dict[str, Set[str]] = {}  # book id -> words (for removal)
+        self._memo: Dict[str, List[Tuple[str, float]]] = {}
+        self._built = False
+
+    # ---------- Build ----------
+    def ensure_built(self, db: Session) -> None:
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+            rows = db.execute(
+                select(Book.id, *[getattr(Book, f) for f in FUZZY_FIELDS])
+            ).all()
+            for row in rows:
+                self._add(row)
+            self._built = True
+
+    # ---------- Maintenance ----------
+    def upsert(self, book: Book) -> None:
+        with self._lock:
+            if not self._built:
+                return
+            self._remove(book.id)
+            self._add(book)
+            self._memo.clear()
+
+    def remove(self, book_id: str) -> None:
+        with self._lock:
+            if self._built:
+                self._remove(book_id)
+                self._memo.clear()
+
+    # ---------- Query ----------
+    def similar(self, db: Session, term: str) -> List[Tuple[str, float]]:
+        """
+        Indexed words at least SIMILARITY_THRESHOLD similar to `term`, best first,
+        as (word, similarity); at most MAX_EXPANSIONS of them.
+        """
+        if len(term) < MIN_TERM_LENGTH or term.isdigit():
+            return []
+        self.ensure_built(db)
+        with self._lock:
+            cached = self._memo.get(term)
+            if cached is not None:
+                return cached
+
+            query = trigrams(term)
+            shared: Dict[str, int] = {}
+            for gram in query:
+                for word in self._grams.get(gram, ()):
+                    shared[word] = shared.get(word, 0) + 1
+            scored = []
+            for word, common in shared.items():
+                similarity = common / (len(query) + self._word_sizes[word] - common)
+                if similarity >= SIMILARITY_THRESHOLD and word != term:
+                    scored.append((similarity, word))
+            scored.sort(key=lambda pair: (-pair[0], pair[1]))
+            result = [(word, similarity) for similarity, word in scored[:MAX_EXPANSIONS]]
+
+            if len(self._memo) >= _MEMO_SIZE:
+                self._memo.clear()
+            self._memo[term] = result
+            return result
+
+    # ---------- Internals ----------
+    def _add(self, book) -> None:
+        words = {w for f in FUZZY_FIELDS for w in tokenize(getattr(book, f, None)) if not w.isdigit()}
+        self._doc_words[book.id] = words
+        for word in words:
+            refs = self._word_refs.get(word, 0)
+            self._word_refs[word] = refs + 1
+            if refs:
+                continue
+            grams = trigrams(word)
+            self._word_sizes[word] = len(grams)
+            for gram in grams:
+                self._grams.setdefault(gram, set()).add(word)
+
+    def _remove(self, book_id: str) -> None:
+        for word in self._doc_words.pop(book_id, ()):
+            refs = self._word_refs.get(word, 0) - 1
+            if refs > 0:
+                self._word_refs[word] = refs
+                continue
+            self._word_refs.pop(word, None)
+            self._word_sizes.pop(word, None)
+            for gram in trigrams(word):
+                words = self._grams.get(gram)
+                if words is not None:
+                    words.discard(word)
+                    if not words:
+                        del self._grams[gram]
+
+
+# Shared per-process index
+trigram_index = TrigramIndex()
@@ -15,8 +15,14 @@ Usage:
     stop_scheduler()
 """
 
+from datetime import datetime
+
 from apscheduler.schedulers.background import BackgroundScheduler
 from services.order_service import OrderService
+from services.book_service import BookService
+from services.similarity_service import SimilarityService
+from services.inventory_stats_service import InventoryStatsService
+from core.token_revocation import token_revocation
 from core.dependencies import get_db
 
 scheduler = BackgroundScheduler()
@@ -32,11 +38,53 @@ def update_order_statuses():
     finally:
         db.close()
 
+def backfill_book_columns():
+    """one-off at startup: fill derived book columns and owner stats for rows written before they existed"""
+    db = next(get_db())
+    try:
+        isbn13_count = BookService.backfill_isbn13(db)
+        if isbn13_count:
+            print(f"Backfilled isbn13 for {isbn13_count} books")
+        price_count = BookService.backfill_effective_price(db)
+        if price_count:
+            print(f"Backfilled effective_price for {price_count} books")
+        stats_count = InventoryStatsService.backfill_missing(db)
+        if stats_count:
+            print(f"Backfilled inventory stats for {stats_count} owners")
+    finally:
+        db.close()
+
+def recompute_similar_books():
+    """daily rebuild of the precomputed "similar books" table"""
+    db = next(get_db())
+    try:
+        written = SimilarityService.recompute(db)
+        print(f"Recomputed similar books ({written} rows)")
+    finally:
+        db.close()
+
+def purge_revoked_tokens():
+    """hourly: drop expired revocations and rebuild the in-memory revocation filter"""
+    db = next(get_db())
+    try:
+        purged = token_revocation.purge_expired(db)
+        if purged:
+            print(f"Purged {purged} expired token revocations")
+    finally:
+        db.close()
+
 def start_scheduler():
     """Start the scheduled task scheduler"""
     # update when app starts
+    backfill_book_columns()
+    # before serving requests: the revocation filter is rebuilt from revoked_tokens
+    purge_revoked_tokens()
     update_order_statuses()
+    scheduler.add_job(purge_revoked_tokens, 'interval', hours=1, id="revoked_tokens_job")
     scheduler.add_job(update_order_statuses, 'interval', hours=1, id="order_status_job")
+    # first run in the background right away rather than delaying startup
+    scheduler.add_job(recompute_similar_books, 'interval', hours=24, id="similar_books_job",
+                      next_run_time=datetime.now())
     scheduler.start()
     print("Order status scheduler started")
 
@@ -0,0 +1,45 @@
+"""
+Bloom filter: set membership in a fixed bit array, with no false negatives and a
+bounded false-positive rate.
+"""
+
+from typing import Iterable
+import hashlib
+import math
+
+
+class BloomFilter:
+    """
+    Sized for `capacity` items at `error_rate` false positives; beyond capacity the
+    rate degrades gracefully. k bit positions per item come from double hashing one
+    BLAKE2b digest. Not thread-safe for concurrent add(); callers hold a lock.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def update(self, items: Iterable[str]) -> None:
+        for item in items:
+            self.add(item)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
@@ -0,0 +1,84 @@
+"""
+Helpers for conditional GET (ETag / Last-Modified / 304 Not Modified).
+"""
+
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+import hashlib
+
+from fastapi import Request, Response
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match covers `etag` (weak comparison, as RFC 9110 requires)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == target:
+            return True
+    return False
+
+
+def weak_etag(prefix: str, *parts: Any) -> str:
+    """Weak validator from a digest of `parts` (for representations built from several rows)."""
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{prefix}-{digest}"'
+
+
+def http_date(value: datetime) -> str:
+    """Format a datetime for Last-Modified; naive values are taken as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def modified_since(request: Request, last_modified: Optional[datetime]) -> bool:
+    """
+    False if If-Modified-Since shows the client already has `last_modified`.
+    Ignored when If-None-Match is present, as RFC 9110 requires.
+    """
+    header = request.headers.get("if-modified-since")
+    if not header or last_modified is None or request.headers.get("if-none-match"):
+        return True
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return True
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # HTTP dates have whole-second resolution
+    return last_modified.replace(microsecond=0) > since
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """True if a conditional GET can be answered with 304."""
+    return etag_matches(request, etag) or not modified_since(request, last_modified)
+
+
+def set_validators(
+    response: Response, etag: str, last_modified: Optional[datetime] = None,
+    cache_control: Optional[str] = "no-cache",
+) -> None:
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+    if cache_control:
+        response.headers["Cache-Control"] = cache_control
+
+
+def not_modified(
+    etag: str, cache_control: Optional[str] = "no-cache", last_modified: Optional[datetime] = None,
+) -> Response:
+    response = Response(status_code=304)
+    set_validators(response, etag, last_modified, cache_control)
+    return response
@@ -0,0 +1,51 @@
+"""
+Opaque cursors for keyset pagination.
+
+A cursor is the sort mode plus the sort key and id of the last row on a page,
+JSON-encoded and base64url-wrapped so clients treat it as an opaque string.
+"""
+
+from typing import Any, Callable, Tuple
+import base64
+import json
+import math
+
+from fastapi import HTTPException
+
+
+def encode_cursor(sort: str, value: Any, last_id: str) -> str:
+    raw = json.dumps([sort, value, last_id], separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: str, sort: str, convert: Callable[[Any], Any] = lambda value: value
+) -> Tuple[Any, str]:
+    """
+    Return (sort key, last id) stored in `cursor`, the key passed through `convert`.
+    400 if the cursor is malformed, was issued for another sort, or `convert` rejects the key
+    (by raising ValueError, TypeError or ArithmeticError).
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(data, list) or len(data) != 3 or not isinstance(data[2], str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if data[0] != sort:
+        raise HTTPException(status_code=400, detail="Cursor does not match the requested sort")
+    try:
+        return convert(data[1]), data[2]
+    except (ValueError, TypeError, ArithmeticError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def finite_float(value: Any) -> float:
+    """float(value), refusing NaN and infinities (which would break keyset comparisons)."""
+    if isinstance(value, bool):
+        raise TypeError("boolean cursor key")
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError("non-finite cursor key")
+    return number
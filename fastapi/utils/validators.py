@@ -0,0 +1,36 @@
+"""
+Input normalization helpers.
+"""
+
+import re
+from typing import Optional
+
+
+def _isbn13_check_digit(first12: str) -> str:
+    total = sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+
+def _isbn10_is_valid(isbn10: str) -> bool:
+    if not re.fullmatch(r"\d{9}[\dX]", isbn10):
+        return False
+    total = sum((10 - i) * (10 if c == "X" else int(c)) for i, c in enumerate(isbn10))
+    return total % 11 == 0
+
+
+def to_isbn13(value: Optional[str]) -> Optional[str]:
+    """
+    Canonical ISBN-13 for an ISBN-10 or ISBN-13 string (hyphens/spaces allowed),
+    or None if it is not a valid ISBN.
+        '0-261-10221-4'     -> '9780261102217'
+        '978-0-261-10221-7' -> '9780261102217'
+    """
+    if not value:
+        return None
+    raw = re.sub(r"[\s-]", "", value).upper()
+    if len(raw) == 13 and raw.isdigit() and raw[:3] in ("978", "979"):
+        return raw if _isbn13_check_digit(raw[:12]) == raw[12] else None
+    if len(raw) == 10 and _isbn10_is_valid(raw):
+        first12 = "978" + raw[:9]
+        return first12 + _isbn13_check_digit(first12)
+    return None